@@ -0,0 +1,178 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+import json
+import logging
+import time
+
+from openai.types import Batch
+from pydantic import ValidationError
+
+from .category_cache import CategoryCache
+from .chat_ctrl import shrink_epg
+from .my_types import EPG, BatchInfo, BatchResult
+from .services.chat_service import ChatClient, ChatRequestError
+from .utils import write_jsonl
+from .xstr import short_str
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchCategorizer:
+    """
+    Kategorisiert EPGs über die Batch-API des Providers (OpenAI-kompatibel):
+    Anfragen als JSONL schreiben, hochladen, auf das Ergebnis warten und
+    die Kategorien per custom_id (= EPG.real_id) zurück zuordnen.
+
+    Fehlgeschlagene Anfragen (Fehlerdatei, Status != 200, ungültige Zeilen)
+    bleiben ohne Kategorie: dann entscheidet der DVB-Content-Code, und der
+    nächste Lauf fragt sie erneut an.
+    """
+
+    def __init__(self, client: ChatClient, prompttxt: str, model: Optional[str] = None,
+                 cache: Optional[CategoryCache] = None):
+        self.client = client
+        self.model = model or client.default_model
+        self.prompttxt = prompttxt
+        self.cache = cache
+
+    def batch_infos(self, epgs: list[EPG]) -> list[BatchInfo]:
+        result = []
+        for epg in epgs:
+            jsonstr = shrink_epg(epg).model_dump(mode="json", exclude_none=True, exclude_defaults=True)
+            usr_msg = {
+                "role": "user",
+                "content": self.prompttxt.replace("<EPGENTRY>", json.dumps(jsonstr, ensure_ascii=False)),
+            }
+            result.append(BatchInfo(customid=epg.real_id, messages=[usr_msg]))
+        return result
+
+    def write_batchfile(self, infos: list[BatchInfo], filepath: Path) -> Path:
+        write_jsonl(
+            filepath=filepath,
+            data=[
+                {
+                    "custom_id": info.customid,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {"model": self.model, "messages": info.messages},
+                }
+                for info in infos
+            ],
+        )
+        return filepath
+
+    def wait(self, batch_id: str, poll: float = 60, timeout: Optional[float] = None) -> Batch:
+        """Wartet bis der Batch-Job fertig ist (mit Ergebnis- und/oder Fehlerdatei)."""
+        started = time.monotonic()
+        while True:
+            batch = self.client.batch_status(batch_id)
+            logger.info("Batch %s: %s %s", batch_id, batch.status, batch.request_counts or "")
+            if batch.status in BATCH_DONE:
+                break
+            if timeout and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Batch {batch_id} not finished after {timeout} seconds")
+            time.sleep(poll)
+        if batch.status != "completed" or not (batch.output_file_id or batch.error_file_id):
+            raise ChatRequestError(f"Batch {batch_id} ended with status {batch.status}")
+        return batch
+
+    @staticmethod
+    def failure(line: str) -> tuple[str, str]:
+        """custom_id ('' wenn unbekannt) und Fehlermeldung einer fehlgeschlagenen Zeile"""
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return '', short_str(line, 80)
+        if not isinstance(data, dict):
+            return '', short_str(line, 80)
+        response = data.get("response") if isinstance(data.get("response"), dict) else {}
+        body = response.get("body") if isinstance(response.get("body"), dict) else {}
+        error = data.get("error") or body.get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        if status := response.get("status_code"):
+            message = f"status {status}: {message or ''}"
+        return str(data.get("custom_id") or ''), message or short_str(line, 80)
+
+    @classmethod
+    def parse_errors(cls, content: str) -> set[str]:
+        """Liest die Fehlerdatei und liefert die custom_ids der fehlgeschlagenen Anfragen."""
+        failed: set[str] = set()
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            custom_id, message = cls.failure(line)
+            logger.error("Batch request %s failed: %s", custom_id or "?", message)
+            if custom_id:
+                failed.add(custom_id)
+        return failed
+
+    @classmethod
+    def parse_results(cls, content: str, failed: Optional[set[str]] = None) -> dict[str, str]:
+        """
+        Ordnet die Ergebnisdatei custom_id -> category zu. Ungültige oder
+        fehlgeschlagene Zeilen werden protokolliert und übersprungen, ihre
+        custom_ids landen in `failed`.
+        """
+        result: dict[str, str] = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                batchresult = BatchResult.model_validate_json(line)
+            except ValidationError:
+                custom_id, message = cls.failure(line)
+                logger.error("Batch result %s not valid: %s", custom_id or "?", message)
+                if custom_id and failed is not None:
+                    failed.add(custom_id)
+                continue
+            text = batchresult.content()
+            if not text or (batchresult.response and batchresult.response.status_code != 200):
+                logger.error("Batch result %s: %s", batchresult.custom_id, cls.failure(line)[1])
+                if failed is not None:
+                    failed.add(batchresult.custom_id)
+                continue
+            text = ChatClient.strip_thinking(text)
+            try:
+                answer: dict = json.loads(text)
+                result[batchresult.custom_id] = str(answer.get("category", "Other"))
+            except ValueError as e:
+                logger.error("Batch result %s not parsable: %s", batchresult.custom_id, e)
+        return result
+
+    def categorize(self, epgs: list[EPG], filepath: Path, poll: float = 60,
+                   timeout: Optional[float] = None) -> None:
+        """Ergänzt `contentinfo` aller EPGs ohne Kategorie über einen Batch-Job."""
+        pending: list[EPG] = []
+        for epg in epgs:
+            if epg.contentinfo:
+                continue
+            if self.cache is not None and (category := self.cache.get(epg.hash)):
+                epg.contentinfo.append(category)
+            else:
+                pending.append(epg)
+        if not pending:
+            logger.info("Batch: nothing to categorize")
+            return
+        self.write_batchfile(self.batch_infos(pending), filepath)
+        batch = self.client.batch_submit(filepath, endpoint=BATCH_ENDPOINT)
+        logger.info("Batch %s submitted with %d requests (%s)", batch.id, len(pending), filepath)
+        batch = self.wait(batch.id, poll=poll, timeout=timeout)
+        failed: set[str] = set()
+        categories: dict[str, str] = {}
+        if batch.output_file_id:
+            categories = self.parse_results(self.client.batch_content(batch.output_file_id), failed)
+        if batch.error_file_id:
+            failed |= self.parse_errors(self.client.batch_content(batch.error_file_id))
+        for epg in pending:
+            if epg.real_id in failed:
+                continue
+            category = categories.get(epg.real_id)
+            if category and self.cache is not None:
+                self.cache.put(epg.hash, category, model=self.model)
+            epg.contentinfo.append(category or "Other")
+        logger.info("Batch %s: %d of %d categorized, %d failed", batch.id, len(categories), len(pending),
+                    len(failed))
@@ -0,0 +1,83 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryCache:
+    """
+    Persistenter Cache für LLM-Kategorien (SQLite), Schlüssel ist `EPG.hash`.
+
+    Einträge älter als `ttl_days` werden verworfen, bei mehr als `maxsize`
+    Einträgen werden die am längsten nicht benutzten gelöscht.
+    """
+
+    def __init__(self, filepath: Path | str, ttl_days: int = 30, maxsize: int = 20000):
+        if isinstance(filepath, str):
+            filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.filepath = filepath
+        self.ttl = timedelta(days=ttl_days)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(filepath)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS category ("
+            " hash TEXT PRIMARY KEY,"
+            " category TEXT NOT NULL,"
+            " model TEXT,"
+            " created TEXT NOT NULL,"
+            " used TEXT NOT NULL)"
+        )
+        self._db.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT category, created FROM category WHERE hash = ?", (key,)
+        ).fetchone()
+        if row and datetime.fromisoformat(row[1]) > datetime.now() - self.ttl:
+            self.hits += 1
+            self._db.execute(
+                "UPDATE category SET used = ? WHERE hash = ?", (datetime.now().isoformat(), key)
+            )
+            self._db.commit()
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, category: str, model: Optional[str] = None) -> None:
+        now = datetime.now().isoformat()
+        self._db.execute(
+            "INSERT OR REPLACE INTO category (hash, category, model, created, used) VALUES (?, ?, ?, ?, ?)",
+            (key, category, model, now, now),
+        )
+        self._db.commit()
+
+    def evict(self) -> int:
+        """Entfernt abgelaufene Einträge und kürzt den Cache auf `maxsize`."""
+        expired = (datetime.now() - self.ttl).isoformat()
+        removed = self._db.execute("DELETE FROM category WHERE created < ?", (expired,)).rowcount
+        removed += self._db.execute(
+            "DELETE FROM category WHERE hash NOT IN "
+            "(SELECT hash FROM category ORDER BY used DESC LIMIT ?)",
+            (self.maxsize,),
+        ).rowcount
+        self._db.commit()
+        if removed:
+            logger.info("Category cache: %d entries evicted", removed)
+        return removed
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM category").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def close(self) -> None:
+        self._db.close()
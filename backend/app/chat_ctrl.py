@@ -5,6 +5,9 @@ from .services.tmdb_types import TVSerial
 # from . import config as cfg
 # from .services.chat_service import ChatClient
 from .my_types import Movie_chat, Serial_chat, Tmdb_Movie, EPG,  EPG_chat
+from .xstr import short_str, unified_sentence, convert_roman
+from difflib import SequenceMatcher
+import json
 import re
 
 
@@ -32,3 +35,74 @@ def shrink_serial(serial:TVSerial) -> Serial_chat:
     return Serial_chat.model_validate(serial.model_dump(exclude_none=True))
     
 
+
+
+def epg_batches(epgs:list[EPG], size:int) -> list[list[EPG]]:
+    """Teilt die EPGs in Batches mit max. `size` Einträgen und eindeutiger eventid."""
+    batches:list[list[EPG]] = []
+    current:list[EPG] = []
+    eventids:set[int] = set()
+    for epg in epgs:
+        if len(current) >= size or epg.eventid in eventids:
+            batches.append(current)
+            current, eventids = [], set()
+        current.append(epg)
+        eventids.add(epg.eventid)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_answer(text:str) -> dict[int, str]:
+    """
+    Liest die Antwort auf einen Batch-Prompt: eine JSON-Liste von
+    {"eventid": ..., "category": ...}. Wirft ValueError, wenn die Antwort
+    nicht dem Format entspricht.
+    """
+    text = re.sub(r'^```(?:json)?|```$', '', text.strip()).strip()
+    answer = json.loads(text)
+    if isinstance(answer, dict):
+        # manche Modelle verpacken die Liste in ein Objekt
+        answer = next((v for v in answer.values() if isinstance(v, list)), None)
+    if not isinstance(answer, list):
+        raise ValueError(f'JSON list expected: {short_str(text, 40)}')
+    result:dict[int, str] = {}
+    for item in answer:
+        if isinstance(item, dict) and 'eventid' in item:
+            result[int(item['eventid'])] = str(item.get('category', 'Other'))
+    return result
+
+
+def title_key(title:str) -> str:
+    """Normalisierter Titel für die Gruppierung gleicher Filme."""
+    return unified_sentence(convert_roman(title), tolower=True)
+
+
+def _description(epg:EPG) -> str:
+    return re.sub(r'\[PDC.*?\]', '', epg.description).strip().lower()
+
+
+def group_epgs(epgs:list[EPG], similarity:float = 0.6) -> list[list[EPG]]:
+    """
+    Gruppiert EPGs mit gleichem normalisierten Titel und ähnlicher Beschreibung
+    (Wiederholungen, gleicher Film auf mehreren Sendern). EPGs ohne
+    Beschreibung bilden eigene Gruppen. Das erste EPG einer Gruppe steht
+    stellvertretend für die Gruppe.
+    """
+    groups:list[list[EPG]] = []
+    by_title:dict[str, list[list[EPG]]] = {}
+    for epg in epgs:
+        candidates = by_title.setdefault(title_key(epg.title), [])
+        description = _description(epg)
+        for group in candidates:
+            other = _description(group[0])
+            # ohne Beschreibung nur zu EPGs, die ebenfalls keine haben
+            if description == other or (description and other and
+                    SequenceMatcher(None, description, other).ratio() >= similarity):
+                group.append(epg)
+                break
+        else:
+            group = [epg]
+            candidates.append(group)
+            groups.append(group)
+    return groups
@@ -87,4 +87,12 @@ Mögliche Kategorien: Movie, Serial, Sport, Show, News, Docu, Other
 Gib nur die Kategorie als JSON-String zurück, in der Form {"category": "Movie"} - keine weiteren Kommentare.
 # EPG Eintrag
 <EPGENTRY>
-"""
\ No newline at end of file
+"""
+
+epg_content_batch_prompt = """
+Analysiere für jeden der folgenden EPG-Einträge Titel und Beschreibung, um die jeweils passendste Kategorie zu bestimmen. Prüfe auf Schlüsselwörter wie 'Dokumentarfilm', 'Interviews', 'Prozess', 'Porträt' oder andere Hinweise auf Inhaltstypen. Entscheide basierend auf dem Kontext, ob es sich um einen Film (Movie), Serien (Serial), Sport, Show, Nachrichten (News), Dokumentation (Docu) handelt. Ist aus den Informationen keine der benannten Kategorien erkennbar antworte mit "Other".
+Mögliche Kategorien: Movie, Serial, Sport, Show, News, Docu, Other
+Gib für jeden Eintrag genau ein Objekt mit der unveränderten eventid zurück, als JSON-Liste in der Form [{"eventid": 123, "category": "Movie"}, ...] - keine weiteren Kommentare.
+# EPG Einträge
+<EPGENTRIES>
+"""
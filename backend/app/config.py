@@ -1,6 +1,6 @@
 # pip install pydantic-settings python-dotenv
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import yaml
@@ -8,6 +8,10 @@ import yaml
 class AiProviderData(BaseModel):
     models: set[str]
     ep: str  # endpoint
+    rpm: Optional[int] = None  # max. Anfragen pro Minute
+    tpm: Optional[int] = None  # max. Tokens pro Minute
+    stream: bool = False  # Antwort streamen und nach dem ersten JSON-Wert abbrechen
+    json_mode: bool = False  # response_format json_object anfordern
 
     @field_validator("models", mode="before")
     @classmethod
@@ -26,9 +30,36 @@ class Settings(BaseSettings):
     plugin_folder: str = './plugins'
     log_folder: str = './data'
     epg_filter: Dict[str, Any] = {}
+    filter_autoorder: bool = True  # Basisfilter nach gemessenen Kosten je Ablehnung sortieren
+    filter_order: List[str] = []  # feste Reihenfolge (Klassennamen) am Anfang der Filterkette
+    epg_shard_size: int = 0  # Favoriten-Kanäle je EPG-Anfrage, 0 = alle in einer Anfrage
+    epg_shard_concurrency: int = 4  # max. gleichzeitige EPG-Anfragen
+    epg_delta: bool = True  # Kategorien unveränderter EPGs aus dem letzten Lauf übernehmen
+    channel_cache_ttl: float = 600  # Sekunden, die Kanallisten zwischengespeichert werden
+    ms_timeouts: Dict[str, float] = {}  # Timeouts je Endpoint: epg, timers, timer_add, channels, version, default
+    ms_retries: int = 2  # Wiederholungen lesender Anfragen bei Netzwerkfehlern/5xx
+    ms_breaker_threshold: int = 5  # Fehler in Folge bis der Circuit Breaker öffnet
+    ms_breaker_reset: float = 30  # Sekunden bis zur nächsten Probe-Anfrage
+    http_max_connections: int = 20  # Connection-Pool des Servers (FastAPI)
+    http_max_keepalive: int = 10  # offen gehaltene Verbindungen
+    http_keepalive_expiry: float = 30.0  # Sekunden bis eine freie Verbindung geschlossen wird
+    http_connect_timeout: float = 5.0  # Sekunden für den Verbindungsaufbau (Media-Server und LLM)
     timerparameters: Dict[str, int] = {'pre': 5, 'post': 5}
+    timer_concurrency: int = 4  # max. gleichzeitige Timer-Anlagen
+    timer_retries: int = 2  # Wiederholungen bei Netzwerkfehlern/5xx
     ai_model: Optional[str] = None
     ai_provider: Dict[str, AiProviderData] = {}
+    ai_concurrency: int = 4  # max. gleichzeitige LLM-Anfragen
+    ai_max_retries: int = 5  # Wiederholungen bei 429/5xx/Timeout
+    ai_fallback: Optional[str] = None  # Komma-Liste von Ausweich-Modellen (andere Provider)
+    ai_timeout: Optional[float] = None  # Sekunden bis zum Wechsel auf das nächste Modell
+    ai_hedge_delay: Optional[float] = None  # Sekunden bis zur zusätzlichen Anfrage beim nächsten Modell
+    ai_preclassify: bool = True  # eindeutige EPGs regelbasiert ohne LLM kategorisieren
+    ai_batch_size: int = 1  # EPGs pro LLM-Anfrage, 1 = einzeln
+    ai_token_budget: Optional[int] = None  # max. Tokens je Lauf, None = unbegrenzt
+    ai_price: Dict[str, float] = {}  # USD pro 1 Mio. Tokens: {'prompt': ..., 'completion': ...}
+    ai_cache_ttl: int = 30  # Tage, die eine Kategorie im Cache gültig bleibt
+    ai_cache_size: int = 20000  # max. Einträge im Kategorie-Cache
 
     model_config = SettingsConfigDict(
         # env_file=".env",        # lädt zusätzlich Variablen aus .env
@@ -1,3 +1,9 @@
+import logging
+import re
+
+from .my_types import EPG
+
+logger = logging.getLogger(__name__)
 
 
 # main_categories_original = {
@@ -187,6 +193,57 @@ def categorie_list(content:int|str) -> list[str]:
     return [item for item in catlst if item]
 
 
+# Eindeutige Hinweise im EPG-Text -> Kategorie (Vokabular wie im LLM-Prompt)
+_GENRES = (r"(?:spiel|fernseh|kino|tv-|kriminal|abenteuer|action|liebes|katastrophen|kriegs|monumental)?film"
+           r"|thriller|komödie|tragikomödie|drama|western|krimi|horror|science-fiction|fantasy|romanze|melodram|actionkomödie")
+text_rules: dict[str, list[re.Pattern]] = {
+    "Movie": [
+        re.compile(r"\b(?:spielfilm|fernsehfilm|kinofilm|tv-film)\b", re.IGNORECASE),
+        # "Thriller, USA 1998", "Komödie, D/F 2005"
+        re.compile(rf"\b(?i:{_GENRES}),\s*[A-ZÄÖÜ][\w/ .\-]{{0,30}}\s(?:19|20)\d{{2}}\b"),
+        # Laufzeit und Produktionsjahr: "USA 1998, 95 Min."
+        re.compile(r"\b(?:19|20)\d{2}\b.{0,20}\b(?:[89]\d|1\d\d)\s*Min\b"),
+    ],
+    "Serial": [
+        re.compile(r"serie\b|\bsitcom\b|\btelenovela\b|\bstaffel\s*\d+|\bfolge\s*\d+|\bepisode\s*\d+", re.IGNORECASE),
+        re.compile(r"\(\d{1,3}/\d{1,3}\)"),
+    ],
+    "Docu": [
+        re.compile(r"\b(?:dokumentation|dokumentarfilm|doku|dokureihe|reportage)\b", re.IGNORECASE),
+    ],
+    "News": [
+        re.compile(r"\b(?:nachrichten|tagesschau|tagesthemen|heute journal|heute-journal)\b", re.IGNORECASE),
+    ],
+    "Sport": [
+        re.compile(r"\b(?:bundesliga|sportschau|formel 1|champions league|biathlon|live-übertragung)\b", re.IGNORECASE),
+    ],
+}
+
+
+def classify_text(title:str, event:str = '', description:str = '') -> str|None:
+    """
+    Regelbasierte Vorab-Kategorie aus dem EPG-Text. Liefert nur dann eine
+    Kategorie, wenn genau eine Kategorie eindeutige Hinweise hat, sonst None.
+    """
+    text = '\n'.join(part for part in (title, event, description[:300]) if part)
+    found = {category for category, patterns in text_rules.items()
+             if any(pattern.search(text) for pattern in patterns)}
+    return found.pop() if len(found) == 1 else None
+
+
+def preclassify(epgs:list[EPG]) -> list[EPG]:
+    """Kategorisiert eindeutige EPGs lokal, liefert die übrigen für das LLM."""
+    remaining = []
+    for epg in epgs:
+        if not epg.contentinfo and (category := classify_text(epg.title, epg.event, epg.description)):
+            logger.info("Rules: %s > %s", category, epg.title)
+            epg.contentinfo.append(category)
+        else:
+            remaining.append(epg)
+    logger.info("Pre-classifier: %d of %d EPGs resolved locally", len(epgs) - len(remaining), len(epgs))
+    return remaining
+
+
 def is_movie(code:int|str):
     if isinstance(code,str):
         code = int(code)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+from pathlib import Path
+import json
+import logging
+
+from .my_types import EPG
+from .utils import f_write, read_json
+
+logger = logging.getLogger(__name__)
+
+
+class EpgSnapshot:
+    """
+    EPG-Stand des letzten Laufs je `EPG.real_id`: Hash beim Abruf und die
+    ermittelten Kategorien.
+
+    `apply` übernimmt für unveränderte EPGs (gleiche real_id und gleicher Hash)
+    die Kategorien des letzten Laufs, sodass nur neue oder geänderte EPGs
+    kategorisiert werden. `save` schreibt den neuen Stand; EPGs, die nicht mehr
+    geliefert werden, fallen dabei heraus.
+    """
+
+    def __init__(self, filepath: Path | str):
+        if isinstance(filepath, str):
+            filepath = Path(filepath)
+        self.filepath = filepath
+        self.entries: dict[str, dict] = {}
+        self.fetched: dict[str, str] = {}  # real_id -> Hash beim Abruf
+        if filepath.exists():
+            try:
+                self.entries = read_json(filepath)
+            except ValueError as e:
+                logger.warning("EPG snapshot %s not readable, full run: %s", filepath, e)
+
+    def apply(self, epgs: list[EPG]) -> None:
+        """
+        Merkt sich die Hashes und ergänzt die Kategorien unveränderter EPGs.
+        Gefiltert wird trotzdem alles (Zeitfenster, Timer ändern sich je Lauf),
+        kategorisiert werden danach nur EPGs ohne Kategorie.
+        """
+        self.fetched = {epg.real_id: epg.hash for epg in epgs}
+        new = changed = reused = 0
+        for epg in epgs:
+            entry = self.entries.get(epg.real_id)
+            if entry is None:
+                new += 1
+            elif entry["hash"] != self.fetched[epg.real_id]:
+                changed += 1
+            elif not epg.contentinfo and entry.get("contentinfo"):
+                epg.contentinfo.extend(entry["contentinfo"])
+                reused += 1
+        removed = len(self.entries.keys() - self.fetched.keys())
+        logger.info("EPG delta: %d new, %d changed, %d unchanged (%d categories reused), %d removed",
+                    new, changed, len(epgs) - new - changed, reused, removed)
+
+    def save(self, epgs: list[EPG]) -> None:
+        """Speichert Hash und Kategorien aller abgerufenen EPGs"""
+        entries: dict[str, dict] = {}
+        for epg in epgs:
+            if (fetched := self.fetched.get(epg.real_id)) is None:
+                continue
+            entry: dict = {"hash": fetched}
+            # "Other" kann auch ein Fehler sein -> beim nächsten Lauf neu fragen
+            if epg.contentinfo and epg.contentinfo != ["Other"]:
+                entry["contentinfo"] = epg.contentinfo
+            entries[epg.real_id] = entry
+        self.entries = entries
+        f_write(self.filepath, json.dumps(entries, ensure_ascii=False))
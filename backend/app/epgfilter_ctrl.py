@@ -12,6 +12,7 @@ from app.filter import (
 )
 from app.mediasrv_ctrl import MS_ControllerBase
 from app.services.ms_types import MS_Timer
+from app.timer_index import TimerIndex
 
 filter_dict:dict[str, type] = {
     cls.__name__: cls for cls in 
@@ -48,5 +49,5 @@ def base_filters(settings:cfg.Settings,timers:list[MS_Timer]):
         if (f:=create_filter(filter_name, settings)):
             filters.append(f)
     if "HasTimerFilter" in settings.epg_filter.keys():
-        filters.append(HasTimerFilter(timers=timers, find_timer=MS_ControllerBase.find_timer))
+        filters.append(HasTimerFilter(timers=TimerIndex(timers), find_timer=MS_ControllerBase.find_timer))
     return filters
@@ -1,8 +1,10 @@
 from __future__ import annotations
 from contextlib import asynccontextmanager, contextmanager
+import logging
 import os
+from pathlib import Path
 from typing import Optional
-from .services.chat_service import AsyncChatClient, ChatClient
+from .services.chat_service import AsyncChatClient, ChatClient, FailoverChatClient
 from . import config as cfg
 import httpx
 from typing import AsyncGenerator, Generator
@@ -11,8 +13,14 @@ from .services.ms_service import AsyncMediaServer
 from .services.ms_service import MediaServer
 from .mediasrv_ctrl import MS_ControllerBase, AsyncMS_Controller, MS_Controller
 from .services.ms_service import AbstractMediaServer
+from .services.resilience import CircuitBreaker, circuit_breaker
+from .filter_engine import FilterOrder
+from .category_cache import CategoryCache
+from .epg_delta import EpgSnapshot
 
 
+logger = logging.getLogger(__name__)
+
 _chat_client = None
 
 
@@ -32,19 +40,24 @@ def chat_client_data(
     # find provider
     provider = ''
     for key, providerdata in settings.ai_provider.items():
-        if settings.ai_model in providerdata.models:
+        if ai_model in providerdata.models:
             provider = key
             break
     if not provider:
-        raise ValueError(f'No provider found for model {settings.ai_model}')
+        raise ValueError(f'No provider found for model {ai_model}')
     api_key = api_key or os.getenv(f'{provider}_API_KEY'.upper(),'')
     if not api_key:
         raise ValueError(f'No API key found for provider {provider}')  
      
     return {'api_key':api_key,
             'base_url':settings.ai_provider[provider].ep,
-            'model':settings.ai_model,
-            'provider':provider}
+            'model':ai_model,
+            'provider':provider,
+            'rpm':settings.ai_provider[provider].rpm,
+            'tpm':settings.ai_provider[provider].tpm,
+            'max_retries':settings.ai_max_retries,
+            'stream':settings.ai_provider[provider].stream,
+            'json_mode':settings.ai_provider[provider].json_mode}
 
 
 
@@ -100,32 +113,113 @@ def create_sync_chat_client(
 def create_async_chat_client( 
         settings:cfg.Settings,
         model:Optional[str]=None,
-        api_key:Optional[str]=None) ->AsyncChatClient:
+        api_key:Optional[str]=None,
+        http_client:Optional[httpx.AsyncClient]=None) -> AsyncChatClient | FailoverChatClient:
     """
-    Erzeugt einen synchronen ChatClient
+    Erzeugt einen asynchronen ChatClient, mit `ai_fallback` einen FailoverChatClient
     """    
     client_data = chat_client_data(settings=settings,model=model,api_key=api_key)
-    return  AsyncChatClient(**client_data) 
+    client = AsyncChatClient(**client_data, http_client=http_client, connect_timeout=settings.http_connect_timeout)
+    if not settings.ai_fallback:
+        return client
+    clients = [client]
+    for fallback_model in settings.ai_fallback.split(','):
+        if not (fallback_model := fallback_model.strip()) or fallback_model == client.default_model:
+            continue
+        try:
+            clients.append(AsyncChatClient(**chat_client_data(settings=settings, model=fallback_model),
+                                           http_client=http_client, connect_timeout=settings.http_connect_timeout))
+        except ValueError as e:
+            logger.warning("Fallback model %s skipped: %s", fallback_model, e)
+    return FailoverChatClient(clients=clients, timeout=settings.ai_timeout, hedge_delay=settings.ai_hedge_delay)
+
+
+
+def create_http_client(settings: cfg.Settings) -> httpx.AsyncClient:
+    """
+    Erzeugt den prozessweiten httpx.AsyncClient (Connection-Pool mit Keep-Alive).
+    Media-Server- und LLM-Anfragen setzen ihre Timeouts selbst (`ms_timeouts`,
+    `http_connect_timeout`), der Timeout des Pools ist nur die Vorgabe.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(AbstractMediaServer.TIMEOUTS["default"], connect=settings.http_connect_timeout),
+    )
+
+
+def media_server_breaker(settings: cfg.Settings) -> CircuitBreaker:
+    """CircuitBreaker des konfigurierten Media-Servers (prozessweit geteilt)"""
+    return circuit_breaker(settings.server_url, failure_threshold=settings.ms_breaker_threshold,
+                           reset_timeout=settings.ms_breaker_reset)
+
+
+def filter_order(settings: cfg.Settings) -> FilterOrder:
+    """Reihenfolge der Basisfilter (`filter_order`, `filter_autoorder`), Statistik im data_folder"""
+    return FilterOrder(filepath=Path(settings.data_folder) / "filter_stats.json",
+                       override=settings.filter_order, auto=settings.filter_autoorder)
+
+
+def category_cache(settings: cfg.Settings) -> CategoryCache:
+    """Kategorie-Cache im data_folder (`ai_cache_ttl`, `ai_cache_size`)"""
+    return CategoryCache(
+        filepath=Path(settings.data_folder) / "category_cache.db",
+        ttl_days=settings.ai_cache_ttl,
+        maxsize=settings.ai_cache_size,
+    )
+
 
+def epg_snapshot(settings: cfg.Settings) -> Optional[EpgSnapshot]:
+    """EPG-Stand des letzten Laufs im data_folder, None ohne `epg_delta`"""
+    if not settings.epg_delta:
+        return None
+    return EpgSnapshot(filepath=Path(settings.data_folder) / "epg_snapshot.json")
 
 
 # ---------- Factory für FastAPI (synchron) ----------
 @contextmanager
-def create_sync_controller(base_url: str, debug: bool = False) -> Generator[MS_Controller, None, None]:
+def create_sync_controller(base_url: str, debug: bool = False,
+                           channel_ttl: float = 600,
+                           timeouts: Optional[dict[str, float]] = None,
+                           retries: int = 2,
+                           breaker: Optional[CircuitBreaker] = None,
+                           connect_timeout: float = AbstractMediaServer.CONNECT_TIMEOUT,
+                           ) -> Generator[MS_Controller, None, None]:
     """
     Erzeugt einen synchronen Controller mit eigenem httpx.Client.
     """    
     with httpx.Client() as client:
-        media = MediaServer(client, base_url, debug=debug)
+        media = MediaServer(client, base_url, debug=debug, channel_ttl=channel_ttl,
+                            timeouts=timeouts, retries=retries, breaker=breaker,
+                            connect_timeout=connect_timeout)
         yield MS_Controller(media)
 
 
 # ---------- Factory für FastAPI (asynchron) ----------
 @asynccontextmanager
-async def create_async_controller(base_url: str, debug: bool = False) -> AsyncGenerator[AsyncMS_Controller, None]:
+async def create_async_controller(base_url: str, debug: bool = False, shard_size: int = 0,
+                                  shard_concurrency: int = 4,
+                                  channel_ttl: float = 600,
+                                  httpclient: Optional[httpx.AsyncClient] = None,
+                                  timeouts: Optional[dict[str, float]] = None,
+                                  retries: int = 2,
+                                  breaker: Optional[CircuitBreaker] = None,
+                                  connect_timeout: float = AbstractMediaServer.CONNECT_TIMEOUT,
+                                  ) -> AsyncGenerator[AsyncMS_Controller, None]:
     """
-    Erzeugt einen asynchronen Controller mit eigenem httpx.AsyncClient.
+    Erzeugt einen asynchronen Controller, mit `httpclient` auf dem gemeinsamen
+    Connection-Pool (wird nicht geschlossen), sonst mit eigenem httpx.AsyncClient.
     """
+    options = dict(debug=debug, shard_size=shard_size, shard_concurrency=shard_concurrency,
+                   channel_ttl=channel_ttl, timeouts=timeouts, retries=retries, breaker=breaker,
+                   connect_timeout=connect_timeout)
+    if httpclient is not None:
+        media = AsyncMediaServer(httpclient, base_url, shared_client=True, **options)  # type: ignore
+        yield AsyncMS_Controller(media)
+        return
     async with httpx.AsyncClient() as client:
-        media = AsyncMediaServer(client, base_url, debug=debug)
+        media = AsyncMediaServer(client, base_url, **options)  # type: ignore
         yield AsyncMS_Controller(media)
\ No newline at end of file
@@ -4,7 +4,9 @@ from datetime import datetime, timedelta
 import json
 import logging
 from pathlib import Path
-from typing import Any, Callable
+import re
+from typing import Any, Callable, Optional
+import time
 
 
 
@@ -12,6 +14,8 @@ from .services.tmdb_types import TVSearchResult
 from .my_types import EPG, EPGFilter
 from .epg_categorie import is_movie
 from .mediasrv_ctrl import MS_ControllerBase
+from .timer_index import TimerIndex
+from .xstr import norm_word, remove_umlaute
 
 logger = logging.getLogger(__name__)
 
@@ -19,28 +23,99 @@ logger = logging.getLogger(__name__)
 # --------------------- EPG filter ---------------------------
 
 
+class PrefixTrie:
+    """Präfixbaum für Blacklist-Einträge mit `*` am Ende"""
+
+    END = ''
+
+    def __init__(self, prefixes: Optional[list[str]] = None):
+        self.root: dict = {}
+        for prefix in prefixes or []:
+            self.add(prefix)
+
+    def add(self, prefix: str) -> None:
+        node = self.root
+        for c in prefix:
+            node = node.setdefault(c, {})
+        node[self.END] = True
+
+    def match(self, s: str) -> bool:
+        """True, wenn ein Eintrag Präfix von `s` ist"""
+        node = self.root
+        if self.END in node:
+            return True
+        for c in s:
+            node = node.get(c)
+            if node is None:
+                return False
+            if self.END in node:
+                return True
+        return False
+
+
 class TitleBlacklstFilter(EPGFilter):
-    def __init__(self, filepath:Path|str):
+    """
+    Titel aus der Blacklist-Datei: exakte Titel als Set, Einträge mit `*` am
+    Ende als Präfixbaum. Die Datei wird neu gelesen, sobald sie sich ändert.
+
+    Konfiguration als Pfad oder dict: {path: ..., normalize: true}
+    (normalize = Vergleich ohne Groß-/Kleinschreibung und Umlaute, `norm_word`).
+    """
+
+    RELOAD_INTERVAL = 2.0  # Sekunden zwischen zwei Prüfungen der Datei
+
+    def __init__(self, filepath:Path|str|dict, normalize:bool=False):
+        if isinstance(filepath,dict):
+            normalize = filepath.get('normalize', normalize)
+            filepath = filepath['path']
         if isinstance(filepath,str):
             filepath = Path(filepath)
         self.filepath = filepath
+        self.normalize = normalize
+        self.blacklist: list[str] = []
+        self.exact: set[str] = set()
+        self.prefixes = PrefixTrie()
+        self.mtime: float|None = None
+        self.checked = 0.0
+        self.load()
+
+    def _mtime(self) -> float|None:
         try:
-            self.blacklist = filepath.read_text(encoding='utf-8').split('\n')
+            return self.filepath.stat().st_mtime
+        except OSError:
+            return None
+
+    def _key(self, title:str, strip:bool=True) -> str:
+        if not self.normalize:
+            return title
+        # Präfixe nicht strippen: "Tatort *" darf "Tatorte" nicht treffen
+        return norm_word(title) if strip else remove_umlaute(title).lower()
+
+    def load(self) -> None:
+        self.mtime = self._mtime()
+        self.checked = time.monotonic()
+        try:
+            self.blacklist = self.filepath.read_text(encoding='utf-8').split('\n')
             self.blacklist = [line.strip() for line in self.blacklist if line.strip() and not line.startswith('#')]
         except (FileNotFoundError, PermissionError, UnicodeDecodeError, IsADirectoryError, OSError) as e:
             logger.warning(f'Could not read blacklist file {self.filepath}: {e}. Continuing without a blacklist.')
             self.blacklist = []
-        
+        self.exact = {self._key(entry) for entry in self.blacklist if not entry.endswith('*')}
+        self.prefixes = PrefixTrie([self._key(entry[:-1], strip=False) for entry in self.blacklist if entry.endswith('*')])
+
+    def reload(self) -> None:
+        """Liest die Datei neu, wenn sich ihr Änderungszeitpunkt geändert hat"""
+        if time.monotonic() - self.checked < self.RELOAD_INTERVAL:
+            return
+        self.checked = time.monotonic()
+        if self._mtime() != self.mtime:
+            self.load()
+            logger.info(f'Blacklist {self.filepath} reloaded, {len(self.blacklist)} entries')
 
     def __call__(self, epg:EPG) -> bool:
-        for entry in self.blacklist:
-            if entry.endswith('*'):
-                if epg.title.startswith(entry[:-1]):
-                    return False
-            else:
-                if entry == epg.title:
-                    return False
-        return True
+        self.reload()
+        title = self._key(epg.title)
+        return title not in self.exact and not self.prefixes.match(title)
     
     def __str__(self) -> str:
         return 'Blacklst ' + self.filepath.name
@@ -100,7 +175,7 @@ class DaysFilter(EPGFilter):
 
 
 class HasTimerFilter (EPGFilter):
-    def __init__(self, timers:list,find_timer:Callable):
+    def __init__(self, timers:list|TimerIndex,find_timer:Callable):
         self.timers = timers
         self.find_timer = find_timer
 
@@ -114,17 +189,40 @@ class HasTimerFilter (EPGFilter):
     
 
 class KeywordFilter (EPGFilter):
-    def __init__(self, keywords:list|str):
+    """
+    Lehnt EPGs ab, deren Titel oder Event (optional auch die Beschreibung)
+    ein Stichwort enthält. Alle Stichwörter stecken in einem regulären
+    Ausdruck, jeder Text wird nur einmal durchsucht.
+
+    Konfiguration als kommagetrennte Liste, Liste oder dict:
+    {keywords: ..., normalize: true, description: true}
+    (normalize = ohne Groß-/Kleinschreibung und Umlaute, `norm_word`).
+    """
+
+    def __init__(self, keywords:list|str|dict, normalize:bool=False, description:bool=False):
+        if isinstance(keywords,dict):
+            normalize = keywords.get('normalize', normalize)
+            description = keywords.get('description', description)
+            keywords = keywords['keywords']
         if isinstance(keywords,str):
             keywords = keywords.split(',')
         self.keywords = keywords
+        self.normalize = normalize
+        self.description = description
+        # längere Stichwörter zuerst, leere ignorieren
+        patterns = sorted({re.escape(self._text(k)) for k in keywords if k}, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(patterns)) if patterns else None
 
+    def _text(self, s:str) -> str:
+        return norm_word(s) if self.normalize else s
 
     def __call__(self, epg:EPG) -> bool:
-        for keyword in self.keywords:
-            if keyword in epg.title or keyword in epg.event:
-                return False
-        return True
+        if self.pattern is None:
+            return True
+        texts = [epg.title, epg.event]
+        if self.description:
+            texts.append(epg.description)
+        return not any(text and self.pattern.search(self._text(text)) for text in texts)
     
     def __str__(self):
         return f'Has Keywords {",".join(self.keywords)}'
@@ -0,0 +1,194 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+import json
+import logging
+import time
+
+from .my_types import EPG, EPGFilter, FilterRejection
+from .utils import dt2str, f_write, read_json
+from .xstr import short_str
+
+logger = logging.getLogger(__name__)
+
+
+def epg_logentry(epg: EPG) -> str:
+    d = {
+        'real_id': epg.real_id,
+        'title': epg.title,
+        'event': epg.event or '',
+        'description': epg.description or '',
+        'contentinfo': epg.contentinfo or '',
+    }
+    s = f'{d["real_id"]}, {d["contentinfo"]}, {d["title"]}, {short_str(d["event"], 15)}, {short_str(d["description"], 15)}'
+    return s.replace('\n', ' ')
+
+
+class FilterStats:
+    """
+    Zähler eines Filters: geprüfte/abgelehnte EPGs und Laufzeit, dazu die
+    Ablehnungen in der Stichprobe (unabhängig von der Position in der Kette)
+    """
+
+    def __init__(self, name: str, key: str = ''):
+        self.name = name
+        self.key = key or name
+        self.evaluated = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self.sampled = 0
+        self.sample_rejected = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "filter": self.name,
+            "evaluated": self.evaluated,
+            "rejected": self.rejected,
+            "ms": round(self.seconds * 1000, 1),
+        }
+
+
+class FilterEngine:
+    """
+    Wendet eine Filterkette in einem Durchlauf an: jedes EPG wird der Reihe
+    nach geprüft, der erste ablehnende Filter beendet die Prüfung.
+
+    Je Filter werden geprüfte/abgelehnte EPGs und die Laufzeit gezählt,
+    abgelehnte EPGs landen in `rejections`.
+
+    Mit `sample` wird jedes n-te EPG von allen Filtern geprüft (ohne
+    Abbruch), damit auch spätere Filter ihre Ablehnungsrate messen. Das
+    Ergebnis ändert sich dadurch nicht.
+    """
+
+    def __init__(self, filters: Iterable[EPGFilter], logentry: Optional[Callable[[EPG], str]] = None,
+                 sample: int = 0):
+        self.filters = list(filters)
+        self.stats = [FilterStats(str(f), FilterOrder.key(f)) for f in self.filters]
+        self.rejections: list[FilterRejection] = []
+        self.logentry = logentry
+        self.sample = sample
+        self.checked = 0
+
+    def accept(self, epg: EPG) -> bool:
+        full = self.sample > 0 and self.checked % self.sample == 0
+        self.checked += 1
+        accepted = True
+        for epgfilter, stats in zip(self.filters, self.stats):
+            started = time.perf_counter()
+            passed = epgfilter(epg)
+            stats.seconds += time.perf_counter() - started
+            stats.evaluated += 1
+            if full:
+                stats.sampled += 1
+                stats.sample_rejected += not passed
+            if not passed and accepted:
+                stats.rejected += 1
+                self._reject(epg, stats.name)
+                if not full:
+                    return False
+                accepted = False
+        return accepted
+
+    def _reject(self, epg: EPG, name: str) -> None:
+        self.rejections.append(FilterRejection(real_id=epg.real_id, title=epg.title, tv_name=epg.tv_name,
+                                               start=dt2str(epg.start), filter=name))
+        if self.logentry:
+            logger.info(f'Rejected {self.logentry(epg)} | {name}')
+
+    def run(self, epgs: Iterable[EPG]) -> tuple[list[EPG], list[FilterRejection]]:
+        """Liefert die verbliebenen EPGs und die Ablehnungen dieses Aufrufs"""
+        first = len(self.rejections)
+        survivors = [epg for epg in epgs if self.accept(epg)]
+        return survivors, self.rejections[first:]
+
+    def stats_lst(self) -> list[dict]:
+        return [stats.as_dict() for stats in self.stats]
+
+    def log_stats(self, label: str = "Filter") -> None:
+        for stats in self.stats:
+            logger.info("%s %s: %d evaluated, %d rejected, %.1f ms",
+                        label, stats.name, stats.evaluated, stats.rejected, stats.seconds * 1000)
+
+
+class FilterOrder:
+    """
+    Reihenfolge einer Filterkette nach Kosten je Ablehnung (Laufzeit je
+    Prüfung / Ablehnungsrate) aus den gespeicherten Statistiken früherer
+    Läufe: günstige, stark filternde Prüfungen kommen zuerst. Filter ohne
+    Statistik laufen vorn, Filter ohne Ablehnung zuletzt. `override`
+    (Klassennamen) legt den Anfang der Kette fest.
+
+    Die Ablehnungsrate stammt aus der Stichprobe (`SAMPLE`), in der alle
+    Filter jedes EPG prüfen. Sonst sähe ein Filter hinten in der Kette nur
+    noch EPGs, die andere schon durchgelassen haben, und käme nie wieder nach
+    vorn. Ältere Läufe zählen je Lauf nur noch mit `DECAY`, sodass geänderte
+    Filter (Stichwörter, Dauer) bald neu bewertet werden.
+
+    Da alle Filter reine Prüfungen sind, ändert die Reihenfolge nur die
+    Laufzeit, nicht das Ergebnis.
+    """
+
+    SAMPLE = 20  # jedes n-te EPG von allen Filtern prüfen
+    DECAY = 0.5  # Gewicht der bisherigen Zähler je neuem Lauf
+    FIELDS = ("evaluated", "rejected", "seconds", "sampled", "sample_rejected")
+
+    def __init__(self, filepath: Path | str, override: Optional[list[str]] = None, auto: bool = True):
+        if isinstance(filepath, str):
+            filepath = Path(filepath)
+        self.filepath = filepath
+        self.override = override or []
+        self.auto = auto
+        self.entries: dict[str, dict] = {}
+        if filepath.exists():
+            try:
+                self.entries = read_json(filepath)
+            except ValueError as e:
+                logger.warning("Filter statistics %s not readable: %s", filepath, e)
+
+    @staticmethod
+    def key(epgfilter: EPGFilter) -> str:
+        return type(epgfilter).__name__
+
+    def cost(self, key: str) -> float:
+        """Sekunden je abgelehntem EPG; 0 = unbekannt"""
+        entry = self.entries.get(key)
+        if not entry or not entry.get("evaluated") or not entry.get("sampled"):
+            return 0.0
+        if not entry.get("sample_rejected"):
+            return float("inf")
+        return (entry["seconds"] / entry["evaluated"]) / (entry["sample_rejected"] / entry["sampled"])
+
+    def order(self, filters: list[EPGFilter]) -> list[EPGFilter]:
+        fixed = {key: idx for idx, key in enumerate(self.override)}
+
+        def rank(epgfilter: EPGFilter) -> tuple[int, float]:
+            key = self.key(epgfilter)
+            return fixed.get(key, len(fixed)), self.cost(key) if self.auto else 0.0
+
+        result = sorted(filters, key=rank)  # stabil: sonst konfigurierte Reihenfolge
+        logger.info("Filter order: %s", ", ".join(
+            f"{self.key(f)} ({self.cost(self.key(f)) * 1e6:.1f} us/rejection)" for f in result))
+        return result
+
+    def record(self, engine: FilterEngine) -> None:
+        """Addiert die Zähler eines Laufs zu den (abgeschwächten) bisherigen und speichert sie"""
+        for stats in engine.stats:
+            entry = self.entries.setdefault(stats.key, {})
+            for field in self.FIELDS:
+                entry[field] = entry.get(field, 0) * self.DECAY + getattr(stats, field)
+        f_write(self.filepath, json.dumps(self.entries, indent=2))
+
+
+def run_filters(epgs: list[EPG], filters: list[EPGFilter], label: str,
+                rejections: list[FilterRejection], order: Optional[FilterOrder] = None) -> list[EPG]:
+    """Filterkette in einem Durchlauf; Ablehnungen werden in `rejections` gesammelt"""
+    if order:
+        filters = order.order(filters)
+    engine = FilterEngine(filters, logentry=epg_logentry, sample=order.SAMPLE if order else 0)
+    epgs, rejected = engine.run(epgs)
+    rejections.extend(rejected)
+    engine.log_stats(label)
+    if order:
+        order.record(engine)
+    return epgs
@@ -2,10 +2,11 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Callable, List, Optional
 from .epg_categorie import categorie_list
-from .services.ms_types import MS_Channel, MS_Epg, MS_Timer, TimerParams
+from .services.ms_types import MS_Channel, MS_Epg, MS_Timer, TimerParams, tv_radio_flag
 from .services.ms_service import MediaServer, AsyncMediaServer
 from .my_types import EPG, EPGFilter
-from .xstr import short_str
+from .filter_engine import FilterEngine, epg_logentry
+from .timer_index import TimerIndex, covers
 import logging
 
 logger = logging.getLogger(__name__)
@@ -51,7 +52,6 @@ class MS_ControllerBase:
         MASK_TUNERTYPE = (1 << (SHIFT_TSID - SHIFT_TUNERTYPE)) - 1  # Bits 29-31
         MASK_TSID      = (1 << (SHIFT_ORBITAL - SHIFT_TSID)) - 1    # Bits 32-47
         MASK_ORBITAL   = (1 << (SHIFT_TV_RADIO_FLAG - SHIFT_ORBITAL)) - 1  # Bits 48-60
-        MASK_TV_RADIO  = (1 << (64 - SHIFT_TV_RADIO_FLAG)) - 1      # Bits 61-62 (2 Bit)
 
         # Zerlegen
         sid       = (ch >> SHIFT_SID) & MASK_SID
@@ -60,7 +60,7 @@ class MS_ControllerBase:
         tunertype = tuner_raw - 1  # weil beim Aufbau +1 addiert wurde
         tsid      = (ch >> SHIFT_TSID) & MASK_TSID
         orbital   = (ch >> SHIFT_ORBITAL) & MASK_ORBITAL
-        tv_radio  = (ch >> SHIFT_TV_RADIO_FLAG) & MASK_TV_RADIO
+        tv_radio  = tv_radio_flag(ch)  # Bits 61-63, wie MS_Channel.is_tv
 
         # Tuner-Typen als Konstanten
         # 0 = DVB-C, 1 = DVB-S, 2 = DVB-T, 3 = ATSC, 4 = DVB-IPTV
@@ -83,8 +83,7 @@ class MS_ControllerBase:
 
     @staticmethod
     def is_tv_channel(channelid: int) -> bool:
-        channel_info = MS_ControllerBase.parse_channel_id(channelid)
-        return channel_info.get("tv_radio_flag") == 1
+        return tv_radio_flag(channelid) == 1
 
     @staticmethod
     def timer_to_timerparams(timer: MS_Timer) -> TimerParams:
@@ -151,47 +150,31 @@ class MS_ControllerBase:
         ]
 
     @staticmethod
-    def find_timer(epg: EPG, timers: List[MS_Timer]) -> List[MS_Timer]:
+    def find_timer(epg: EPG, timers: List[MS_Timer] | TimerIndex) -> List[MS_Timer]:
+        if isinstance(timers, TimerIndex):
+            return timers.find(epg)
         timerlst = [
             timer for timer in timers
             if epg.tv_channel == timer.channel_id and
             timer.start_datetime <= epg.start < timer.stop_datetime
         ]
-        result = []
-        for t in timerlst:
-            maxstart = max(t.start_datetime, epg.start)
-            minstop = min(t.stop_datetime, epg.stop)
-            duration = int((minstop - maxstart).total_seconds() / 60)
-            percent = duration / epg.duration if epg.duration else 0
-            if percent >= 1:
-                result.append(t)
-        return result
+        return [t for t in timerlst if covers(t, epg)]
 
     @staticmethod
     def epg_logentry(epg: EPG) -> str:
-        d = {
-            'real_id': epg.real_id,
-            'title': epg.title,
-            'event': epg.event or '',
-            'description': epg.description or '',
-            'contentinfo': epg.contentinfo or '',
-        }
-        s = f'{d["real_id"]}, {d["contentinfo"]}, {d["title"]}, {short_str(d["event"], 15)}, {short_str(d["description"], 15)}'
-        return s.replace('\n', ' ')
+        return epg_logentry(epg)
+
+    @staticmethod
+    def filter_engine(filters: List[EPGFilter]) -> FilterEngine:
+        return FilterEngine(filters, logentry=epg_logentry)
 
     @staticmethod
     def apply_filter(epgs: List[EPG], epgfilter: EPGFilter) -> list[EPG]:
-        result = [epg for epg in epgs if epgfilter(epg)]
-        for epg in epgs:
-            if not epgfilter(epg):
-                logger.info(f'Rejected {MS_ControllerBase.epg_logentry(epg)} | {str(epgfilter)}')
-        return result
+        return MS_ControllerBase.filter_epgs(epgs, [epgfilter])
 
     @staticmethod
     def filter_epgs(epgs: List[EPG], filters: List[EPGFilter]) -> List[EPG]:
-        result = epgs
-        for f in filters:
-            result = MS_ControllerBase.apply_filter(result, f)
+        result, _ = MS_ControllerBase.filter_engine(filters).run(epgs)
         return result
     
 
@@ -213,14 +196,19 @@ class MS_Controller(MS_ControllerBase):
     def fetch_epgs(self, favonly: bool = False, filters: List[EPGFilter] = []) -> List[EPG]:
         filters = filters or []
         epgs = []
-        channels = self.ms_server.channel_lst(epgonly=True)
+        # bei favonly reicht die (auch für den EPG-Abruf genutzte) Favoritenliste
+        channels = self.ms_server.channel_lst(favonly=favonly, epgonly=True)
         channel_dict = {c.epgid: c for c in channels}
-        for msepg in self.ms_server.epg_lst(favonly=favonly):
+        engine = self.filter_engine(filters)
+        # Konvertieren und Filtern schon während des Downloads
+        for msepg in self.ms_server.epg_iter(favonly=favonly):
             channel = channel_dict.get(msepg.channel)
             if not channel:
                 continue
-            epgs.append(self.msepg_to_epg(msepg, channel))
-        return self.filter_epgs(epgs, filters)
+            epg = self.msepg_to_epg(msepg, channel)
+            if engine.accept(epg):
+                epgs.append(epg)
+        return epgs
 
     def fetch_timers(self, enabledonly: bool = False) -> List[MS_Timer]:
         return self.ms_server.timer_lst(enabledonly=enabledonly)
@@ -255,16 +243,20 @@ class AsyncMS_Controller(MS_ControllerBase):
     async def fetch_epgs(self, favonly: bool = False, filters: List[EPGFilter] = []) -> List[EPG]:
         filters = filters or []
         epgs = []
-        channels = await self.ms_server.channel_lst(epgonly=True)
+        # bei favonly reicht die (auch für den EPG-Abruf genutzte) Favoritenliste
+        channels = await self.ms_server.channel_lst(favonly=favonly, epgonly=True)
         channel_dict = {c.epgid: c for c in channels}
-        msepgs = await self.ms_server.epg_lst(favonly=favonly)
-        for msepg in msepgs:
+        engine = self.filter_engine(filters)
+        # Konvertieren und Filtern schon während des Downloads
+        async for msepg in self.ms_server.epg_iter(favonly=favonly):
             #channel = await self.channel_for_epgid(msepg.channel)
             channel = channel_dict.get(msepg.channel)
             if not channel:
                 continue        
-            epgs.append(self.msepg_to_epg(msepg, channel))
-        return self.filter_epgs(epgs, filters)
+            epg = self.msepg_to_epg(msepg, channel)
+            if engine.accept(epg):
+                epgs.append(epg)
+        return epgs
 
     async def fetch_timers(self, enabledonly: bool = False) -> List[MS_Timer]:
         return await self.ms_server.timer_lst(enabledonly=enabledonly)
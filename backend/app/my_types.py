@@ -3,7 +3,7 @@ from datetime import datetime
 from datetime import date
 import hashlib
 import re
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field, computed_field
 from .services.tmdb_types import Tmdb_Movie, TVSerial
 
@@ -104,75 +104,83 @@ class TVEvent(BaseModel):
 #     reasoning: str = Field(..., description="Human-readable explanation for the assigned probability")
 
 
-# class ChoiceMessage(BaseModel):
-#     """
-#     The message object nested inside a completion choice.
-#     """
-#     role: str
-#     content: str
-
-
-# class Choice(BaseModel):
-#     """
-#     A single choice returned by the chat completion.
-#     """
-#     index: int
-#     message: ChoiceMessage
-#     finish_reason: str
-
-
-# class Usage(BaseModel):
-#     """
-#     Token-usage statistics for the request.
-#     """
-#     prompt_tokens: int
-#     completion_tokens: int
-#     total_tokens: int
-
-
-# class ResponseBody(BaseModel):
-#     """
-#     The body of the HTTP response, i.e. a standard OpenAI-style chat completion.
-#     """
-#     id: str
-#     object: str
-#     created: int
-#     model: str
-#     choices: List[Choice]
-#     usage: Usage
-#     system_fingerprint: Optional[str] = None
-
-
-# class ResponseEnvelope(BaseModel):
-#     """
-#     The `response` object inside the top-level batch result.
-#     """
-#     status_code: int
-#     request_id: str
-#     body: ResponseBody
-
-
-# class BatchResult(BaseModel):
-#     """
-#     Root object returned by an OpenAI batch job.
-#     """
-#     id: str
-#     custom_id: str
-#     response: ResponseEnvelope
-#     error: Optional[str] = None
-
-#     # ------------------------------------------------------------------
-#     # Helper to quickly get the parsed `Candidate` list out of the JSON
-#     # ------------------------------------------------------------------
-#     def parsed_candidates(self) -> List[Candidate]:
-#         """
-#         Parse the JSON string inside `response.body.choices[0].message.content`
-#         into a list of `Candidate` objects.
-#         """
-#         import json
-
-#         content = self.response.body.choices[0].message.content
-#         return [Candidate(**item) for item in json.loads(content)]
+class ChoiceMessage(BaseModel):
+    """
+    The message object nested inside a completion choice.
+    """
+    role: str
+    content: Optional[str] = None
+
+
+class Choice(BaseModel):
+    """
+    A single choice returned by the chat completion.
+    """
+    index: int
+    message: ChoiceMessage
+    finish_reason: Optional[str] = None
+
+
+class Usage(BaseModel):
+    """
+    Token-usage statistics for the request.
+    """
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+class ResponseBody(BaseModel):
+    """
+    The body of the HTTP response, i.e. a standard OpenAI-style chat completion.
+    """
+    id: str
+    object: str
+    created: int
+    model: str
+    choices: List[Choice]
+    usage: Optional[Usage] = None
+    system_fingerprint: Optional[str] = None
+
+
+class ResponseEnvelope(BaseModel):
+    """
+    The `response` object inside the top-level batch result.
+    """
+    status_code: int
+    request_id: str
+    body: ResponseBody
+
+
+class BatchResult(BaseModel):
+    """
+    Root object returned by an OpenAI batch job.
+    """
+    id: str
+    custom_id: str
+    response: Optional[ResponseEnvelope] = None
+    error: Optional[dict] = None
+
+    def content(self) -> str:
+        """
+        The message content of the first choice, '' if the request failed.
+        """
+        if self.error or not self.response or not self.response.body.choices:
+            return ''
+        return self.response.body.choices[0].message.content or ''
+
+    # ------------------------------------------------------------------
+    # Helper to quickly get the parsed `Candidate` list out of the JSON
+    # ------------------------------------------------------------------
+    # def parsed_candidates(self) -> List[Candidate]:
+    #     """
+    #     Parse the JSON string inside `response.body.choices[0].message.content`
+    #     into a list of `Candidate` objects.
+    #     """
+    #     import json
+
+    #     content = self.response.body.choices[0].message.content
+    #     return [Candidate(**item) for item in json.loads(content)]
 
 
 # -------------- Serial and Episode -----------------------------------
@@ -221,4 +229,26 @@ class Movie_chat(BaseModel):
 
 class BatchInfo(BaseModel):
     customid: str
-    messages: List[dict[str, str]]
\ No newline at end of file
+    messages: List[dict[str, str]]
+
+# -------------------  Timer Result ---------------------------------
+
+class TimerResult(BaseModel):
+    """Ergebnis der Timer-Anlage für einen Film"""
+    real_id: str
+    title: str
+    tv_name: str
+    start: str
+    status: Literal['created', 'exists', 'covered', 'duplicate', 'failed']  # duplicate = doppelter Eintrag der Filmliste
+    attempts: int = 0
+    error: Optional[str] = None
+
+# -------------------  Filter Rejection ---------------------------------
+
+class FilterRejection(BaseModel):
+    """Ein vom Filter abgelehntes EPG"""
+    real_id: str
+    title: str
+    tv_name: str
+    start: str
+    filter: str
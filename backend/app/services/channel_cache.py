@@ -0,0 +1,61 @@
+from __future__ import annotations
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+import asyncio
+import time
+
+T = TypeVar("T")
+
+
+class ChannelCache(Generic[T]):
+    """
+    Zwischenspeicher einer Media-Server-Instanz (z. B. Kanallisten) mit TTL.
+
+    Gehört zur Instanz und wird mit ihr freigegeben. `aget` holt den Wert bei
+    gleichzeitigen Aufrufen nur einmal (ein Lock je Schlüssel).
+    """
+
+    def __init__(self, ttl: float = 600):
+        self.ttl = ttl
+        self._entries: dict[Hashable, tuple[float, T]] = {}
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def get(self, key: Hashable) -> Optional[T]:
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: T) -> T:
+        if self.ttl > 0:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def fetch(self, key: Hashable, loader: Callable[[], T]) -> T:
+        if (value := self.get(key)) is not None:
+            return value
+        return self.put(key, loader())
+
+    async def afetch(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # evtl. hat ein gleichzeitiger Aufruf den Wert inzwischen geholt
+            if (value := self.get(key)) is not None:
+                return value
+            return self.put(key, await loader())
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Verwirft einen Eintrag oder (ohne `key`) alle"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
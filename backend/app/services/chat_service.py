@@ -1,16 +1,140 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import random
 import re
-from openai import OpenAI, AsyncOpenAI, APIError, AuthenticationError
+from openai import (DEFAULT_TIMEOUT, OpenAI, AsyncOpenAI, APIError, AuthenticationError, RateLimitError,
+                    APIConnectionError, InternalServerError)
 from openai.types.chat.chat_completion import ChatCompletion
+from openai.types import Batch
+from pathlib import Path
 from os import getenv
 import asyncio
-from typing import Optional
+import bisect
+import httpx
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Fehler, bei denen sich ein erneuter Versuch lohnt (APITimeoutError ist ein APIConnectionError)
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
 
 class ChatRequestError(Exception):
     """Exception für alle OpenAI-API-Fehler"""
     pass
 
 
+class JsonScanner:
+    """
+    Erkennt inkrementell den ersten vollständigen JSON-Wert (Objekt oder Liste)
+    in einem gestreamten Text. <think>-Blöcke und Text davor werden übersprungen.
+    """
+
+    THINK_START = "<think>"
+    THINK_END = "</think>"
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.start = -1
+        self.stack: list[str] = []
+        self.in_string = False
+        self.escape = False
+        self.in_think = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Hängt `chunk` an; liefert den JSON-Text, sobald er vollständig ist"""
+        self.text += chunk
+        text = self.text
+        while self.pos < len(text):
+            if self.in_think:
+                end = text.find(self.THINK_END, self.pos)
+                if end < 0:
+                    self.pos = max(self.pos, len(text) - len(self.THINK_END))
+                    return None
+                self.pos = end + len(self.THINK_END)
+                self.in_think = False
+                continue
+            c = text[self.pos]
+            if self.start < 0:
+                if c == "<":
+                    rest = text[self.pos:self.pos + len(self.THINK_START)]
+                    if rest == self.THINK_START:
+                        self.in_think = True
+                        self.pos += len(self.THINK_START)
+                        continue
+                    if self.THINK_START.startswith(rest):
+                        return None  # Tag evtl. noch unvollständig
+                elif c in "{[":
+                    self.start = self.pos
+                    self.stack.append("}" if c == "{" else "]")
+                self.pos += 1
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c in "{[":
+                self.stack.append("}" if c == "{" else "]")
+            elif c in "}]":
+                if self.stack and self.stack[-1] == c:
+                    self.stack.pop()
+                if not self.stack:
+                    return text[self.start:self.pos + 1]
+            self.pos += 1
+        return None
+
+
+class StreamAnswer:
+    """Ergebnis von `ask_stream`: JSON-Wert, gesamter gelesener Text und ggf. usage"""
+
+    def __init__(self, content: str, text: str, usage: Any = None):
+        self.content = content
+        self.text = text
+        self.usage = usage
+
+
+class LatencyHistogram:
+    """Antwortzeiten (Sekunden) in festen Buckets"""
+
+    BUCKETS = (0.5, 1, 2, 5, 10, 30, 60)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+        self.errors = 0
+
+    def add(self, seconds: float) -> None:
+        self.total += seconds
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def as_dict(self) -> dict:
+        labels = [f"<={b}s" for b in self.BUCKETS] + [f">{self.BUCKETS[-1]}s"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg": round(self.total / self.count, 2) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
 class BaseChatClient:
     """Basisklasse mit gemeinsamen Funktionalitäten für sync und async Chatbots"""
     
@@ -25,6 +149,8 @@ class BaseChatClient:
         self.provider = provider
         self._base_url = base_url
         self._api_key = api_key
+        # Antworten als Stream abholen (nur AsyncChatClient)
+        self.stream = False
     
     def _get_headers(self) -> dict[str, str]:
         """Zusätzliche Header für die API-Anfrage"""
@@ -41,12 +167,16 @@ class BaseChatClient:
             "base_url": str(self._base_url)
         } 
     
+    @staticmethod
+    def strip_thinking(text: str) -> str:
+        """Entfernt <think>-Blöcke, hack for ollama thinking models"""
+        return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
+
     @staticmethod
     def get_result_content(completion: ChatCompletion) -> str:
         """Extrahiert den Inhalt aus der Completion"""
         if (response_text := completion.choices[0].message.content if completion.choices else None): 
-            # remove thinking, hack for ollama thinking models 
-            return re.sub(r"<think>.*?</think>", "", response_text, flags=re.DOTALL).strip() 
+            return BaseChatClient.strip_thinking(response_text)
         return ''
 
 
@@ -81,6 +211,33 @@ class ChatClient(BaseChatClient):
                 error_msg = f"API-Anfrage fehlgeschlagen: {e}"
             
             raise ChatRequestError(error_msg) from e              
+
+    def batch_submit(self, filepath: Path, endpoint: str = "/v1/chat/completions") -> Batch:
+        """Lädt eine JSONL-Batchdatei hoch und startet den Batch-Job"""
+        try:
+            with filepath.open("rb") as f:
+                batchfile = self.client.files.create(file=f, purpose="batch")
+            return self.client.batches.create(
+                input_file_id=batchfile.id,
+                endpoint=endpoint,  # type: ignore
+                completion_window="24h",
+            )
+        except APIError as e:
+            raise ChatRequestError(f"Batch-Anfrage fehlgeschlagen: {e}") from e
+
+    def batch_status(self, batch_id: str) -> Batch:
+        """Liefert den aktuellen Zustand eines Batch-Jobs"""
+        try:
+            return self.client.batches.retrieve(batch_id)
+        except APIError as e:
+            raise ChatRequestError(f"Batch-Status fehlgeschlagen: {e}") from e
+
+    def batch_content(self, file_id: str) -> str:
+        """Lädt die Ergebnisdatei (JSONL) eines Batch-Jobs"""
+        try:
+            return self.client.files.content(file_id).text
+        except APIError as e:
+            raise ChatRequestError(f"Batch-Ergebnis fehlgeschlagen: {e}") from e
         
 
 
@@ -93,33 +250,232 @@ class AsyncChatClient(BaseChatClient):
                  base_url:str,                 
                  api_key:str= '',
                  model: Optional[str] = None,
+                 rpm: Optional[int] = None,
+                 tpm: Optional[int] = None,
+                 max_retries: int = 5,
+                 stream: bool = False,
+                 json_mode: bool = False,
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 connect_timeout: Optional[float] = None,
                  ):
         super().__init__(api_key=api_key, base_url=base_url, model=model, provider=provider)
-        self.client_async: AsyncOpenAI = AsyncOpenAI(api_key=api_key, base_url=base_url)
-    
+        # Wiederholungen übernimmt ask(), nicht der OpenAI-Client;
+        # mit `http_client` werden die Verbindungen des gemeinsamen Pools genutzt
+        timeout = DEFAULT_TIMEOUT
+        if connect_timeout is not None:
+            timeout = httpx.Timeout(DEFAULT_TIMEOUT.read, connect=connect_timeout)
+        self.client_async: AsyncOpenAI = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                                     http_client=http_client, timeout=timeout)
+        self.limiter = rate_limiter(provider, rpm=rpm, tpm=tpm)
+        self.max_retries = max_retries
+        self.latency = LatencyHistogram()
+        self.stream = stream
+        self.json_mode = json_mode
+
+    def latency_stats(self) -> dict[str, dict]:
+        return {self.provider: self.latency.as_dict()}
+
+    @staticmethod
+    def _server_delay(error: APIError) -> Optional[float]:
+        """Wartezeit aus Retry-After / retry-after-ms, falls vorhanden"""
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        if (value := response.headers.get("retry-after-ms")):
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        if (value := response.headers.get("retry-after")):
+            try:
+                return float(value)
+            except ValueError:
+                try:
+                    return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+        return None
+
+    @staticmethod
+    def _retry_delay(error: APIError, attempt: int) -> float:
+        """
+        Wartezeit vor dem nächsten Versuch: Retry-After oder exponentiell mit
+        Jitter, höchstens RETRY_MAX_DELAY
+        """
+        if (delay := AsyncChatClient._server_delay(error)) is not None:
+            if delay > RETRY_MAX_DELAY:
+                logger.warning("Retry-After of %.0fs capped to %.0fs", delay, RETRY_MAX_DELAY)
+            return min(RETRY_MAX_DELAY, max(0.0, delay))
+        return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def _request_args(self) -> dict[str, Any]:
+        args: dict[str, Any] = {"extra_headers": self._get_headers()}
+        if self.json_mode:
+            args["response_format"] = {"type": "json_object"}
+        return args
+
+    async def _request(self, call: Callable[[], Awaitable[T]], messages: list[dict[str, str]]) -> T:
+        """Führt `call` mit Rate-Limit und Wiederholung bei 429/5xx/Timeout aus"""
+        # grobe Schätzung für das Token-Limit: ~4 Zeichen pro Token
+        tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+        attempt = 0
+        while True:
+            await self.limiter.acquire(tokens)
+            started = time.monotonic()
+            try:
+                result = await call()
+                self.latency.add(time.monotonic() - started)
+                self.limiter.success()
+                return result
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise ChatRequestError(f"API-Anfrage fehlgeschlagen nach {attempt + 1} Versuchen: {e}") from e
+                delay = self._retry_delay(e, attempt)
+                if isinstance(e, RateLimitError):
+                    self.limiter.throttle(delay)
+                logger.warning("%s: %s, retry %d in %.1fs", self.provider, type(e).__name__, attempt + 1, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+            except APIError as e:
+                if isinstance(e, AuthenticationError):
+                    error_msg = f"Authentifizierung fehlgeschlagen: {e}"
+                else:
+                    error_msg = f"API-Anfrage fehlgeschlagen: {e}"
+
+                raise ChatRequestError(error_msg) from e
+
     async def ask(self, messages: list[dict[str, str]], model: Optional[str] = None) -> ChatCompletion:
-        """Asynchrone Anfrage"""
+        """Asynchrone Anfrage mit Rate-Limit und Wiederholung bei 429/5xx/Timeout"""
         model = model or self.default_model
         if not model:
             raise AttributeError('model not set')
-        try:
-            completion = await self.client_async.chat.completions.create(
+        return await self._request(
+            lambda: self.client_async.chat.completions.create(
                 model=model,
-                extra_headers=self._get_headers(),
                 messages=messages,  # type: ignore
+                **self._request_args(),
+            ),
+            messages,
+        )
+
+    async def ask_stream(self, messages: list[dict[str, str]], model: Optional[str] = None) -> StreamAnswer:
+        """
+        Asynchrone Anfrage als Stream: liefert den ersten vollständigen JSON-Wert
+        der Antwort und schließt den Stream sofort danach (<think>-Text wird übersprungen).
+        `usage` gibt es nur, wenn der Stream bis zum Ende gelesen wurde; sonst
+        zählt der gesamte gelesene Text (inkl. <think>) als Antwort.
+        """
+        model = model or self.default_model
+        if not model:
+            raise AttributeError('model not set')
+
+        async def call() -> StreamAnswer:
+            stream = await self.client_async.chat.completions.create(
+                model=model,  # type: ignore
+                messages=messages,  # type: ignore
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._request_args(),
             )
-            return completion
-        except APIError as e:
-            if isinstance(e, AuthenticationError):
-                error_msg = f"Authentifizierung fehlgeschlagen: {e}"
-            else:
-                error_msg = f"API-Anfrage fehlgeschlagen: {e}"
-            
-            raise ChatRequestError(error_msg) from e        
-        
-        # completion = await self.client_async.chat.completions.create(
-        #     model=model,
-        #     extra_headers=self._get_headers(),
-        #     messages=messages,  # type: ignore
-        # )
-        # return completion
\ No newline at end of file
+            scanner = JsonScanner()
+            usage = None
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if chunk.choices and (delta := chunk.choices[0].delta.content):
+                        if (result := scanner.feed(delta)) is not None:
+                            return StreamAnswer(result, scanner.text)
+            finally:
+                await stream.close()
+            return StreamAnswer(self.strip_thinking(scanner.text), scanner.text, usage)
+
+        return await self._request(call, messages)
+
+
+class FailoverChatClient(BaseChatClient):
+    """
+    Verteilt Anfragen auf mehrere AsyncChatClients (Reihenfolge = Priorität).
+    Bei Fehler oder Timeout (`timeout`) wird der nächste Provider gefragt;
+    mit `hedge_delay` wird nach dieser Zeit zusätzlich der nächste Provider
+    gestartet und die erste gültige Antwort genommen.
+    """
+
+    def __init__(self,
+                 clients: list[AsyncChatClient],
+                 timeout: Optional[float] = None,
+                 hedge_delay: Optional[float] = None,
+                 ):
+        if not clients:
+            raise ValueError('No chat client given')
+        primary = clients[0]
+        super().__init__(provider=primary.provider, base_url=primary._base_url, model=primary.default_model)
+        self.clients = clients
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.stream = primary.stream
+
+    def info(self) -> dict:
+        info = super().info()
+        info["fallback"] = [f"{c.provider}/{c.default_model}" for c in self.clients[1:]]
+        return info
+
+    def latency_stats(self) -> dict[str, dict]:
+        return {f"{c.provider}/{c.default_model}": c.latency.as_dict() for c in self.clients}
+
+    async def _ask_client(self, client: AsyncChatClient, messages: list[dict[str, str]],
+                          model: Optional[str], stream: bool) -> ChatCompletion | StreamAnswer:
+        request = client.ask_stream if stream else client.ask
+        try:
+            return await asyncio.wait_for(request(messages=messages, model=model), timeout=self.timeout)
+        except (asyncio.TimeoutError, ChatRequestError) as e:
+            client.latency.errors += 1
+            logger.warning("%s/%s failed: %s", client.provider, client.default_model, str(e) or type(e).__name__)
+            raise
+
+    async def ask(self, messages: list[dict[str, str]], model: Optional[str] = None) -> ChatCompletion:
+        """Asynchrone Anfrage mit Failover und optionalen Hedged Requests"""
+        return await self._failover(messages, model, stream=False)  # type: ignore
+
+    async def ask_stream(self, messages: list[dict[str, str]], model: Optional[str] = None) -> StreamAnswer:
+        """Wie `AsyncChatClient.ask_stream`, mit Failover und optionalen Hedged Requests"""
+        return await self._failover(messages, model, stream=True)  # type: ignore
+
+    async def _failover(self, messages: list[dict[str, str]], model: Optional[str],
+                        stream: bool) -> ChatCompletion | StreamAnswer:
+        # das angefragte Modell gilt nur für den primären Provider
+        candidates = iter([(self.clients[0], model)] + [(c, None) for c in self.clients[1:]])
+        pending: set[asyncio.Task] = set()
+        errors: list[BaseException] = []
+
+        def start_next() -> bool:
+            if (candidate := next(candidates, None)) is None:
+                return False
+            client, client_model = candidate
+            pending.add(asyncio.create_task(self._ask_client(client, messages, client_model, stream)))
+            return True
+
+        start_next()
+        has_next = len(self.clients) > 1
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if has_next else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Latenzschwelle überschritten -> zusätzliche Anfrage
+                    has_next = start_next()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())  # type: ignore
+                if not pending:
+                    has_next = start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise ChatRequestError(f"Alle Provider fehlgeschlagen: {errors}")
@@ -2,19 +2,38 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from datetime import datetime
-from functools import lru_cache
-from typing import Any, List, Tuple
-from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Iterator, List, Tuple
 from httpx._models import Response
 from urllib.parse import urljoin
+import asyncio
+import time
 import httpx 
 from httpx import Client, AsyncClient
-from .ms_transformers import xml_to_epglst, xml_to_channellst,  xml_to_timerlst
-from .ms_types import MS_Channel, MS_Timer, MS_Epg, TimerParams
+from .channel_cache import ChannelCache
+from .response_cache import ResponseCache, response_cache
+from .resilience import CircuitBreaker, CircuitOpenError, circuit_breaker, is_transient, retry_delay
+from .ms_transformers import xml_to_channellst,  xml_to_timerlst, EpgStreamParser
+from .ms_types import MS_Channel, MS_ChannelList, MS_Timer, MS_TimerList, MS_Epg, TimerParams
 from pathlib import Path
 from typing import Any, Optional
 
 
+PROBE_WAIT = 0.1  # Sekunden zwischen zwei Prüfungen, ob die Probe-Anfrage fertig ist
+
+
+def parse_channels(text: str) -> List[MS_Channel]:
+    return MS_ChannelList.validate_python(xml_to_channellst(text))
+
+
+def parse_timers(text: str) -> List[MS_Timer]:
+    return MS_TimerList.validate_python(xml_to_timerlst(text))
+
+
+def select_channels(channels: List[MS_Channel], tvonly: bool = False, epgonly: bool = False) -> List[MS_Channel]:
+    """Filtert eine (zwischengespeicherte) Kanalliste lokal und liefert Kopien"""
+    return [c.model_copy() for c in channels
+            if (not tvonly or c.is_tv) and (not epgonly or c.epgid)]
+
 
 class AbstractMediaServer(ABC):
     """Abstrakte Basisklasse für alle Media-Server-Clients (echt oder gemockt)."""
@@ -26,6 +45,38 @@ class AbstractMediaServer(ABC):
     EPG_LST = "/api/epg.html"
     VERSION = "/api/version.html"
 
+    # Timeouts (Sekunden) je Endpoint, überschreibbar über `timeouts`
+    ENDPOINT_NAMES = {TIMER_LST: "timers", TIMER_ADD: "timer_add", CHANNEL_LST: "channels",
+                      EPG_LST: "epg", VERSION: "version"}
+    TIMEOUTS = {"epg": 120.0, "timer_add": 15.0, "default": 10.0}
+    # Verbindungsaufbau: kurz, damit Anfragen bei einem Neustart des Servers schnell scheitern
+    CONNECT_TIMEOUT = 5.0
+    # nur lesende Anfragen werden wiederholt (timeradd nicht)
+    IDEMPOTENT = {TIMER_LST, CHANNEL_LST, EPG_LST, VERSION}
+
+    def _timeout(self, endpoint: str) -> httpx.Timeout:
+        timeouts: dict[str, float] = getattr(self, "timeouts", self.TIMEOUTS)
+        timeout = timeouts.get(self.ENDPOINT_NAMES.get(endpoint, ""), timeouts["default"])
+        connect: float = getattr(self, "connect_timeout", self.CONNECT_TIMEOUT)
+        return httpx.Timeout(timeout, connect=min(connect, timeout))
+
+    def _attempts(self, endpoint: str) -> int:
+        return getattr(self, "retries", 0) + 1 if endpoint in self.IDEMPOTENT else 1
+
+    def _retry_after(self, error: Exception, attempt: int, attempts: int, yielded: bool = False) -> float:
+        """Wartezeit vor der nächsten Anfrage; wirft `error` weiter, wenn nicht wiederholt wird"""
+        if not is_transient(error):
+            raise error
+        self.breaker.failure(error)  # type: ignore
+        # nach den ersten EPGs keine Wiederholung (sonst doppelte Einträge)
+        if yielded or attempt + 1 >= attempts:
+            raise error
+        return retry_delay(attempt)
+
+    @staticmethod
+    def _epg_parser(response: Response) -> EpgStreamParser:
+        return EpgStreamParser(encoding=response.charset_encoding)
+
     # ------------------------------------------------------------------
     # Abstrakte Methoden (die jede konkrete Klasse implementieren muss)
     # ------------------------------------------------------------------
@@ -86,57 +137,104 @@ class AbstractMediaServer(ABC):
 # 2. Konkrete Produktiv-Implementierung 
 # ===================================================================
 class MediaServer(AbstractMediaServer):
-    def __init__(self, httpclient:httpx.Client, url: str, debug: bool = False) -> None:
+    def __init__(self, httpclient:httpx.Client, url: str, debug: bool = False,
+                 channel_ttl: float = 600, timeouts: Optional[dict[str, float]] = None,
+                 retries: int = 2, breaker: Optional[CircuitBreaker] = None,
+                 connect_timeout: float = AbstractMediaServer.CONNECT_TIMEOUT) -> None:
         self.base_url = url
         self.debug = debug
         self.rawtext = ""
         self.client = httpclient
+        self.channels: ChannelCache[List[MS_Channel]] = ChannelCache(ttl=channel_ttl)
+        self.responses: ResponseCache = response_cache(url)
+        self.timeouts = {**self.TIMEOUTS, **(timeouts or {})}
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.breaker = breaker or circuit_breaker(url)
 
 
     # ------------- interne Helfer (nicht Teil des öffentlichen ABC) -------------
-    def _client_get(self, endpoint: str, params: dict) -> Response:
+    def _client_get(self, endpoint: str, params: dict, headers: Optional[dict] = None) -> Response:
         url = urljoin(self.base_url, endpoint)
-
-        response: Response = self.client.get(url=url, params=params) # type: ignore
+        attempts = self._attempts(endpoint)
+        for attempt in range(attempts):
+            with self.breaker.guard(url):
+                try:
+                    response: Response = self.client.get(url=url, params=params, headers=headers,  # type: ignore
+                                                         timeout=self._timeout(endpoint))
+                    if response.status_code >= 500:
+                        response.raise_for_status()
+                except Exception as e:
+                    time.sleep(self._retry_after(e, attempt, attempts))
+                    continue
+                self.breaker.success()
+                break
         if self.debug:
             self.rawtext = response.text
         return response
+
+    def _cached_get(self, endpoint: str, params: dict, parse: Callable[[str], Any]) -> Any:
+        """GET über den ResponseCache: unveränderte Antworten werden nicht neu geparst"""
+        key = self.responses.key(endpoint, params)
+        response = self._client_get(endpoint=endpoint, params=params, headers=self.responses.headers(key))
+        return self.responses.resolve(key, response, parse)
     
 
     def _tv_channels(self, params: dict) -> List[MS_Channel]:
-        response = self._client_get(endpoint=self.CHANNEL_LST, params=params)
-        response.raise_for_status()
-        dictlst = xml_to_channellst(response.text)
-        return [MS_Channel.model_validate(d) for d in dictlst]
+        return self._cached_get(self.CHANNEL_LST, params, parse_channels)
 
-    def _timer_lst(self, enabledonly: bool = False) -> List[dict]:
+    def _timer_lst(self, enabledonly: bool = False) -> List[MS_Timer]:
         params = {"utf8": 2}
         if enabledonly:
             params["enabledonly"] = 1
-        response = self._client_get(endpoint=self.TIMER_LST, params=params)
-        response.raise_for_status()
-        return xml_to_timerlst(response.text)
-
-    def _epgs(self, favonly: bool = False) -> List[dict]:
+        return self._cached_get(self.TIMER_LST, params, parse_timers)
+
+    def _epg_stream(self, params: dict) -> Iterator[dict]:
+        url = urljoin(self.base_url, self.EPG_LST)
+        attempts = self._attempts(self.EPG_LST)
+        for attempt in range(attempts):
+            with self.breaker.guard(url):
+                yielded = False
+                try:
+                    # Antwort wird während des Downloads geparst
+                    with self.client.stream("GET", url, params=params,
+                                            timeout=self._timeout(self.EPG_LST)) as response:
+                        response.raise_for_status()
+                        parser = self._epg_parser(response)
+                        raw = []
+                        for chunk in response.iter_bytes():
+                            if self.debug:
+                                raw.append(chunk)
+                            for d in parser.feed(chunk):
+                                yielded = True
+                                yield d
+                        yield from parser.close()
+                        if self.debug:
+                            self.rawtext = b"".join(raw).decode(response.encoding or "utf-8")
+                except Exception as e:
+                    time.sleep(self._retry_after(e, attempt, attempts, yielded))
+                    continue
+                self.breaker.success()
+                return
+
+    def _epgs(self, favonly: bool = False) -> Iterator[dict]:
         params: dict[str, Any] = {"lvl": 2}
         if favonly:
             favchannels = self.channel_lst(favonly=True)
             params["ch"] = ",".join(c.epgid for c in favchannels)
-        response = self._client_get(endpoint=self.EPG_LST, params=params)
-        response.raise_for_status()
-        return xml_to_epglst(response.text)
+        yield from self._epg_stream(params)
 
     # ------------- öffentliche Schnittstelle (implementiert ABC) -------------
-    @lru_cache(maxsize=10)
     def channel_lst(
         self, tvonly: bool = False, favonly: bool = False, epgonly: bool = False
     ) -> List[MS_Channel]:
-        flags = {"tvonly": tvonly, "favonly": favonly, "epgonly": epgonly}
-        params = {k: "1" for k, v in flags.items() if v}
-        return self._tv_channels(params=params)
+        # nur Favoriten oder alle Kanäle werden abgefragt, tvonly/epgonly lokal gefiltert
+        params = {"favonly": "1"} if favonly else {}
+        channels = self.channels.fetch(favonly, lambda: self._tv_channels(params=params))
+        return select_channels(channels, tvonly=tvonly, epgonly=epgonly)
 
     def timer_lst(self, enabledonly: bool = False) -> List[MS_Timer]:
-        return [MS_Timer.model_validate(d) for d in self._timer_lst(enabledonly=enabledonly)]
+        return list(self._timer_lst(enabledonly=enabledonly))
 
     def timer_byid(self, timerid: str) -> MS_Timer:
         params = {"utf8": 2, "id": timerid}
@@ -154,8 +252,13 @@ class MediaServer(AbstractMediaServer):
         timerlst = xml_to_timerlst(response.text) if response.text else []
         return {'duperror': duperror,'timerlst':timerlst}
 
+    def epg_iter(self, favonly: bool = False) -> Iterator[MS_Epg]:
+        """Liefert die EPG-Daten als Generator, schon während des Downloads"""
+        for d in self._epgs(favonly=favonly):
+            yield MS_Epg.model_validate(d)
+
     def epg_lst(self, favonly: bool = False) -> List[MS_Epg]:
-        return [MS_Epg.model_validate(d) for d in self._epgs(favonly=favonly)]
+        return list(self.epg_iter(favonly=favonly))
 
     def version(self) -> str:
         response = self._client_get(endpoint=self.VERSION, params={})
@@ -165,6 +268,10 @@ class MediaServer(AbstractMediaServer):
     def currentdatetime(self) -> datetime:
         return datetime.now()
 
+    def invalidate_channels(self) -> None:
+        """Kanallisten beim nächsten Aufruf neu laden"""
+        self.channels.invalidate()
+
 
     def __enter__(self):
         return self  # Wird als `as`-Variable zurückgegeben
@@ -184,54 +291,155 @@ class MediaServer(AbstractMediaServer):
 
 
 class AsyncMediaServer(AbstractMediaServer):
-    def __init__(self, httpclient: httpx.AsyncClient, url: str, debug: bool = False) -> None:
+    def __init__(self, httpclient: httpx.AsyncClient, url: str, debug: bool = False,
+                 shard_size: int = 0, shard_concurrency: int = 4, channel_ttl: float = 600,
+                 shared_client: bool = False, timeouts: Optional[dict[str, float]] = None,
+                 retries: int = 2, breaker: Optional[CircuitBreaker] = None,
+                 connect_timeout: float = AbstractMediaServer.CONNECT_TIMEOUT) -> None:
         self.base_url = url
         self.debug = debug
         self.rawtext = ""
         self.client = httpclient
+        # gemeinsamer Connection-Pool des Prozesses -> close() schließt ihn nicht
+        self.shared_client = shared_client
+        self.channels: ChannelCache[List[MS_Channel]] = ChannelCache(ttl=channel_ttl)
+        self.responses: ResponseCache = response_cache(url)
+        self.timeouts = {**self.TIMEOUTS, **(timeouts or {})}
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.breaker = breaker or circuit_breaker(url)
+        # EPG der Favoriten in Gruppen zu `shard_size` Kanälen parallel abfragen (0 = eine Anfrage)
+        self.shard_size = shard_size
+        self.shard_concurrency = shard_concurrency
 
     # ------------- interne Helfer (asynchron) -------------
-    async def _client_get(self, endpoint: str, params: dict) -> httpx.Response:
+    async def _client_get(self, endpoint: str, params: dict, headers: Optional[dict] = None) -> httpx.Response:
         url = urljoin(self.base_url, endpoint)
-        response = await self.client.get(url=url, params=params)
+        attempts = self._attempts(endpoint)
+        for attempt in range(attempts):
+            with self.breaker.guard(url):
+                try:
+                    response = await self.client.get(url=url, params=params, headers=headers,
+                                                      timeout=self._timeout(endpoint))
+                    if response.status_code >= 500:
+                        response.raise_for_status()
+                except Exception as e:
+                    await asyncio.sleep(self._retry_after(e, attempt, attempts))
+                    continue
+                self.breaker.success()
+                break
         if self.debug:
             self.rawtext = response.text
         return response
 
+    async def _cached_get(self, endpoint: str, params: dict, parse: Callable[[str], Any]) -> Any:
+        """GET über den ResponseCache: unveränderte Antworten werden nicht neu geparst"""
+        key = self.responses.key(endpoint, params)
+        response = await self._client_get(endpoint=endpoint, params=params, headers=self.responses.headers(key))
+        return self.responses.resolve(key, response, parse)
+
     async def _tv_channels(self, params: dict) -> List[MS_Channel]:
-        response = await self._client_get(endpoint=self.CHANNEL_LST, params=params)
-        response.raise_for_status()
-        dictlst = xml_to_channellst(response.text)
-        return [MS_Channel.model_validate(d) for d in dictlst]
+        return await self._cached_get(self.CHANNEL_LST, params, parse_channels)
 
-    async def _timer_lst(self, enabledonly: bool = False) -> List[dict]:
+    async def _timer_lst(self, enabledonly: bool = False) -> List[MS_Timer]:
         params = {"utf8": 2}
         if enabledonly:
             params["enabledonly"] = 1
-        response = await self._client_get(endpoint=self.TIMER_LST, params=params)
-        response.raise_for_status()
-        return xml_to_timerlst(response.text)
-
-    async def _epgs(self, favonly: bool = False) -> List[dict]:
+        return await self._cached_get(self.TIMER_LST, params, parse_timers)
+
+    async def _epg_stream(self, params: dict) -> AsyncIterator[dict]:
+        url = urljoin(self.base_url, self.EPG_LST)
+        attempts = self._attempts(self.EPG_LST)
+        for attempt in range(attempts):
+            with self.breaker.guard(url):
+                yielded = False
+                try:
+                    # Antwort wird während des Downloads geparst
+                    async with self.client.stream("GET", url, params=params,
+                                                  timeout=self._timeout(self.EPG_LST)) as response:
+                        response.raise_for_status()
+                        parser = self._epg_parser(response)
+                        raw = []
+                        async for chunk in response.aiter_bytes():
+                            if self.debug:
+                                raw.append(chunk)
+                            for d in parser.feed(chunk):
+                                yielded = True
+                                yield d
+                        for d in parser.close():
+                            yield d
+                        if self.debug:
+                            self.rawtext = b"".join(raw).decode(response.encoding or "utf-8")
+                except Exception as e:
+                    await asyncio.sleep(self._retry_after(e, attempt, attempts, yielded))
+                    continue
+                self.breaker.success()
+                return
+
+    async def _epg_shards(self, epgids: List[str]) -> AsyncIterator[dict]:
+        """Fragt die Kanäle gruppenweise parallel ab und liefert die EPGs in Ankunftsreihenfolge"""
+        shards = [epgids[i:i + self.shard_size] for i in range(0, len(epgids), self.shard_size)]
+        semaphore = asyncio.Semaphore(max(1, self.shard_concurrency))
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def fetch(shard: List[str]) -> None:
+            try:
+                while True:
+                    try:
+                        async with semaphore:
+                            async for d in self._epg_stream({"lvl": 2, "ch": ",".join(shard)}):
+                                await queue.put(d)
+                        break
+                    except CircuitOpenError:
+                        # abgelehnt, weil ein anderer Shard gerade probt -> dessen Ergebnis abwarten
+                        if not self.breaker.probing:
+                            raise
+                        await asyncio.sleep(PROBE_WAIT)
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                await queue.put(done)
+
+        tasks = [asyncio.create_task(fetch(shard)) for shard in shards]
+        try:
+            running = len(tasks)
+            while running:
+                item = await queue.get()
+                if item is done:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _epgs(self, favonly: bool = False) -> AsyncIterator[dict]:
         params: dict[str, Any] = {"lvl": 2}
         if favonly:
-            favchannels = await self.channel_lst(favonly=True)
-            params["ch"] = ",".join(c.epgid for c in favchannels)
-        response = await self._client_get(endpoint=self.EPG_LST, params=params)
-        response.raise_for_status()
-        return xml_to_epglst(response.text)
+            epgids = [c.epgid for c in await self.channel_lst(favonly=True)]
+            if self.shard_size and len(epgids) > self.shard_size:
+                async for d in self._epg_shards(epgids):
+                    yield d
+                return
+            params["ch"] = ",".join(epgids)
+        async for d in self._epg_stream(params):
+            yield d
 
     # ------------- öffentliche Schnittstelle (asynchron) -------------
 
     async def channel_lst(
         self, tvonly: bool = False, favonly: bool = False, epgonly: bool = False
     ) -> List[MS_Channel]:
-        flags = {"tvonly": tvonly, "favonly": favonly, "epgonly": epgonly}
-        params = {k: "1" for k, v in flags.items() if v}
-        return await self._tv_channels(params=params)
+        # nur Favoriten oder alle Kanäle werden abgefragt, tvonly/epgonly lokal gefiltert
+        params = {"favonly": "1"} if favonly else {}
+        channels = await self.channels.afetch(favonly, lambda: self._tv_channels(params=params))
+        return select_channels(channels, tvonly=tvonly, epgonly=epgonly)
 
     async def timer_lst(self, enabledonly: bool = False) -> List[MS_Timer]:
-        return [MS_Timer.model_validate(d) for d in await self._timer_lst(enabledonly=enabledonly)]
+        return list(await self._timer_lst(enabledonly=enabledonly))
 
     async def timer_byid(self, timerid: str) -> MS_Timer:
         params = {"utf8": 2, "id": timerid}
@@ -248,8 +456,13 @@ class AsyncMediaServer(AbstractMediaServer):
         timerlst = xml_to_timerlst(response.text) if response.text else []
         return {'duperror': duperror, 'timerlst': timerlst}
 
+    async def epg_iter(self, favonly: bool = False) -> AsyncIterator[MS_Epg]:
+        """Liefert die EPG-Daten als Generator, schon während des Downloads"""
+        async for d in self._epgs(favonly=favonly):
+            yield MS_Epg.model_validate(d)
+
     async def epg_lst(self, favonly: bool = False) -> List[MS_Epg]:
-        return [MS_Epg.model_validate(d) for d in await self._epgs(favonly=favonly)]
+        return [msepg async for msepg in self.epg_iter(favonly=favonly)]
 
     async def version(self) -> str:
         response = await self._client_get(endpoint=self.VERSION, params={})
@@ -259,8 +472,13 @@ class AsyncMediaServer(AbstractMediaServer):
     async def currentdatetime(self) -> datetime:
         return datetime.now()
 
+    def invalidate_channels(self) -> None:
+        """Kanallisten beim nächsten Aufruf neu laden"""
+        self.channels.invalidate()
+
     async def close(self) -> None:
-        await self.client.aclose()
+        if not self.shared_client:
+            await self.client.aclose()
 
 # ===================================================================
 # 3. Mock-Implementierung – liefert nur statische Fixtures
@@ -286,7 +504,6 @@ class MockMediaServer(AbstractMediaServer):
         self._version = version
 
     # ------------- öffentliche Schnittstelle (implementiert ABC) -------------
-    @lru_cache(maxsize=10)
     def channel_lst(
         self, tvonly: bool = False, favonly: bool = False, epgonly: bool = False
     ) -> List[MS_Channel]:
@@ -317,6 +534,9 @@ class MockMediaServer(AbstractMediaServer):
             return result
         return self._epgs.copy()
 
+    def epg_iter(self, favonly: bool = False) -> Iterator[MS_Epg]:
+        yield from self.epg_lst(favonly=favonly)
+
     def version(self) -> str:
         return self._version
     
@@ -1,27 +1,107 @@
-
+import codecs
+import logging
+import os
+import re
 import xml.etree.ElementTree as ET
 
-from typing import Any
+from typing import Any, Iterable, Iterator, Optional
+
+try:
+    from lxml import etree as lxml_etree  # optional, schneller und fehlertolerant
+except ImportError:
+    lxml_etree = None
+
+logger = logging.getLogger(__name__)
+
+
+class EtreeBackend:
+    """XML-Parser der Standardbibliothek"""
+
+    name = 'etree'
+
+    def fromstring(self, text: str | bytes) -> Any:
+        return ET.fromstring(text)
+
+    def pullparser(self) -> Any:
+        return ET.XMLPullParser(events=('start', 'end'))
+
+    def finish(self, pullparser: Any) -> None:
+        pass
+
+
+class LxmlBackend:
+    """
+    lxml mit `huge_tree` (sehr große EPG-Antworten) und `recover`
+    (DVBViewer liefert gelegentlich Zeichen, die nicht zum Charset passen).
+    Übersprungene Fehler werden in `recovered` gezählt und geloggt.
+    """
+
+    name = 'lxml'
+    XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+    def __init__(self):
+        self._parser = lxml_etree.XMLParser(huge_tree=True, recover=True,  # type: ignore
+                                            resolve_entities=False, no_network=True)
+        self.recovered = 0
+
+    def _report(self, error_log: Any) -> None:
+        if errors := len(error_log):
+            self.recovered += errors
+            logger.warning("lxml recovered from %d XML errors, first: %s", errors, error_log[0])
 
+    def fromstring(self, text: str | bytes) -> Any:
+        if isinstance(text, str):
+            # lxml lehnt str mit encoding-Deklaration ab
+            text = self.XML_DECLARATION.sub('', text, count=1)
+        root = lxml_etree.fromstring(text, parser=self._parser)  # type: ignore
+        self._report(self._parser.error_log)
+        return root
 
+    def pullparser(self) -> Any:
+        return lxml_etree.XMLPullParser(events=('start', 'end'), huge_tree=True,  # type: ignore
+                                        recover=True, resolve_entities=False, no_network=True)
 
-def xml_to_channellst(text:str) ->list[dict]:
+    def finish(self, pullparser: Any) -> None:
+        self._report(pullparser.feed_error_log)
+
+
+def select_backend(name: Optional[str] = None) -> EtreeBackend | LxmlBackend:
+    """ElementTree; lxml nur mit XML_BACKEND=lxml (im Benchmark langsamer, verwirft fehlerhafte Einträge)"""
+    name = (name or os.getenv('XML_BACKEND', '')).lower()
+    if name != 'lxml':
+        return EtreeBackend()
+    if lxml_etree is None:
+        logger.warning("XML_BACKEND=lxml, but lxml is not installed, using ElementTree")
+        return EtreeBackend()
+    return LxmlBackend()
+
+
+# einmalig beim Import gewählt
+BACKEND: EtreeBackend | LxmlBackend = select_backend()
+
+
+def elements(parent: Any) -> Iterator[Any]:
+    """Kindelemente ohne Kommentare/Processing Instructions (lxml)"""
+    return (child for child in parent if isinstance(child.tag, str))
+
+
+def xml_to_channellst(text:str, backend: Optional[EtreeBackend | LxmlBackend] = None) ->list[dict]:
     channels = []
-    root = ET.fromstring(text=text)   
+    root = (backend or BACKEND).fromstring(text)   
     # Variante 1: channels > root > group > channel
     # Variante 2: channels > root > group > channel
     for group in root.findall('.//group'):
         for channel in group.findall('channel'):
-            channels.append(channel.attrib)
+            channels.append(dict(channel.attrib))
     
     return channels
 
 
 
 
-def xml_to_timerlst(xml_data) -> list[dict]:
+def xml_to_timerlst(xml_data, backend: Optional[EtreeBackend | LxmlBackend] = None) -> list[dict]:
     # XML parsen
-    root = ET.fromstring(xml_data)
+    root = (backend or BACKEND).fromstring(xml_data)
 
     # Alle Timer-Elemente finden
     timers = root.findall('Timer')
@@ -30,8 +110,8 @@ def xml_to_timerlst(xml_data) -> list[dict]:
     timer_list = []
     for timer in timers:
         # Timer als Dictionary mit Attributen und Unterelementen speichern
-        d:dict[str,Any] = timer.attrib       
-        for child in timer:
+        d:dict[str,Any] = dict(timer.attrib)
+        for child in elements(timer):
             # Wenn das Element selbst Attribute hat (wie Options)
             key = child.tag
             if key in d.keys():
@@ -53,24 +133,78 @@ def xml_to_timerlst(xml_data) -> list[dict]:
 
 
 
-def xml_to_epglst(xml_content):
-    root = ET.fromstring(xml_content)
-    epglst = []
-    
-    for epgentry in root.findall('programme'):
-        d = {}
-        d.update(epgentry.attrib)  # Attribute (start, stop, channel)
-        
-        for child in epgentry:
-            if len(child) > 0:  # Hat Unterelemente?
-                tmp = {}
-                for subchild in child:
-                    tmp[subchild.tag] = subchild.text
-                d[child.tag] = tmp
-            else:
-                d[child.tag] = child.text
-        
-        epglst.append(d)
-    
-    return epglst
-
+def programme_to_dict(epgentry: Any) -> dict:
+    d = {}
+    d.update(epgentry.attrib)  # Attribute (start, stop, channel)
+
+    for child in elements(epgentry):
+        if len(child) > 0:  # Hat Unterelemente?
+            tmp = {}
+            for subchild in elements(child):
+                tmp[subchild.tag] = subchild.text
+            d[child.tag] = tmp
+        else:
+            d[child.tag] = child.text
+    return d
+
+
+def xml_to_epglst(xml_content, backend: Optional[EtreeBackend | LxmlBackend] = None):
+    root = (backend or BACKEND).fromstring(xml_content)
+    return [programme_to_dict(epgentry) for epgentry in root.findall('programme')]
+
+
+class EpgStreamParser:
+    """
+    Inkrementeller Parser für epg.html: nimmt die Antwort in Teilstücken
+    entgegen und liefert jedes vollständige `programme` als dict.
+    Verarbeitete Elemente werden sofort wieder freigegeben.
+    """
+
+    def __init__(self, backend: Optional[EtreeBackend | LxmlBackend] = None, encoding: Optional[str] = None):
+        self._backend = backend or BACKEND
+        self._parser = self._backend.pullparser()
+        self._root: Any = None
+        self._depth = 0
+        # Charset aus dem HTTP-Header: Bytes selbst dekodieren (sonst gilt die XML-Deklaration)
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace') if encoding else None
+
+    def _events(self) -> Iterator[dict]:
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                self._depth += 1
+                continue
+            self._depth -= 1
+            # nur direkte Kinder der Wurzel (wie root.findall('programme'))
+            if self._depth == 1 and elem.tag == 'programme':
+                yield programme_to_dict(elem)
+                if hasattr(elem, 'getprevious'):
+                    # lxml: Elemente im Aufbau dürfen nicht aus dem Baum entfernt werden
+                    elem.clear(keep_tail=True)
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+                else:
+                    self._root.clear()
+
+    def feed(self, chunk: bytes | str) -> Iterator[dict]:
+        if self._decoder and isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._parser.feed(chunk)
+        yield from self._events()
+
+    def close(self) -> Iterator[dict]:
+        if self._decoder and (rest := self._decoder.decode(b'', final=True)):
+            self._parser.feed(rest)
+        self._parser.close()
+        self._backend.finish(self._parser)
+        yield from self._events()
+
+
+def iter_epglst(chunks: Iterable[bytes | str],
+                backend: Optional[EtreeBackend | LxmlBackend] = None) -> Iterator[dict]:
+    """Wie `xml_to_epglst`, aber für eine gestreamte Antwort (Generator)"""
+    parser = EpgStreamParser(backend)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -1,9 +1,36 @@
 
+from functools import lru_cache
 from typing import Literal, Optional, Dict
-from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, computed_field, field_validator
 from datetime import datetime, date, time, timedelta
 
 
+# Datums-/Zeitwerte wiederholen sich stark (gleiche Tage, volle/halbe Stunden),
+# strptime ist dagegen teuer -> Ergebnisse zwischenspeichern
+@lru_cache(maxsize=4096)
+def str2date(value: str) -> date:
+    if value.count('.') == 2:
+        # "20.07.2025"
+        return datetime.strptime(value, '%d.%m.%Y').date()
+    # "2025-08-03"
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+@lru_cache(maxsize=4096)
+def str2time(value: str) -> time:
+    return datetime.strptime(value, '%H:%M:%S').time()
+
+
+@lru_cache(maxsize=16384)
+def str2epgdatetime(value: str) -> datetime:
+    return datetime.strptime(value, "%Y%m%d%H%M%S")
+
+
+def tv_radio_flag(channel_id: int | str) -> int:
+    """TV/Radio-Flag der Kanal-ID (Bits 61-63): 0 = nicht definiert, 1 = TV, 2 = Radio"""
+    return (int(channel_id) >> 61) & 0b111
+
+
 class MS_Channel(BaseModel):
     nr: str
     name: str
@@ -18,6 +45,13 @@ class MS_Channel(BaseModel):
         validate_default=True
     )
 
+    @property
+    def is_tv(self) -> bool:
+        try:
+            return tv_radio_flag(self.channel_id) == 1
+        except ValueError:
+            return False
+
 
 
 class TimerChannel(BaseModel):
@@ -68,19 +102,14 @@ class MS_Timer(BaseModel):
 
     @field_validator('sdate', mode='before')
     def parse_date(cls, v):
-        if isinstance(v, str):
-            if v.count('.') == 2:
-                # "20.07.2025"
-                return datetime.strptime(v, '%d.%m.%Y').date()
-            elif v.count('-') == 2:
-                # "2025-08-03"
-                return datetime.strptime(v, '%Y-%m-%d').date()
+        if isinstance(v, str) and (v.count('.') == 2 or v.count('-') == 2):
+            return str2date(v)
         return v
 
     @field_validator('start', 'end', mode='before')
     def parse_time(cls, v):
         if isinstance(v, str):
-            return datetime.strptime(v, '%H:%M:%S').time()
+            return str2time(v)
         return v
 
     @field_validator('duration', mode='before')
@@ -143,7 +172,7 @@ class MS_Epg(BaseModel):
 
     @field_validator('start', 'stop', mode='before')
     def parse_datetime(cls, value: str) -> datetime:
-        return datetime.strptime(value, "%Y%m%d%H%M%S")
+        return str2epgdatetime(value)
 
     @field_validator('content', mode='before')
     def parse_content(cls, value: str | None) -> int:
@@ -165,6 +194,11 @@ class MS_Epg(BaseModel):
 
 
 
+# Bulk-Validierung ganzer Listen in einem Aufruf (pydantic-core statt Python-Schleife)
+MS_ChannelList = TypeAdapter(list[MS_Channel])
+MS_TimerList = TypeAdapter(list[MS_Timer])
+
+
 class TimerParams(BaseModel):
     # --- Pflichtfelder (kein Default) ---
     ch: str
@@ -0,0 +1,69 @@
+from __future__ import annotations
+from typing import Optional
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token-Bucket mit Reservierung: `reserve` zieht die Menge sofort ab (der
+    Bestand darf negativ werden) und liefert die Wartezeit, bis die Reservierung
+    gedeckt ist. Dadurch ist kein Lock nötig.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, scale: float = 1.0) -> float:
+        rate = self.capacity * scale / 60.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / rate)
+
+
+class RateLimiter:
+    """
+    Begrenzt Anfragen/min (`rpm`) und Tokens/min (`tpm`) eines Providers.
+    Nach einem 429 werden alle Anfragen pausiert und die Rate halbiert,
+    jede erfolgreiche Anfrage erhöht sie wieder schrittweise.
+    """
+
+    MIN_SCALE = 0.1
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.scale = 1.0
+        self.paused_until = 0.0
+        self.throttled = 0
+
+    async def acquire(self, tokens: int = 0) -> None:
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1, self.scale))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens, self.scale))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttle(self, delay: float) -> None:
+        self.throttled += 1
+        self.scale = max(self.MIN_SCALE, self.scale / 2)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def success(self) -> None:
+        self.scale = min(1.0, self.scale + 0.05)
+
+
+_limiters: dict[str, RateLimiter] = {}
+
+
+def rate_limiter(provider: str, rpm: Optional[int] = None, tpm: Optional[int] = None) -> RateLimiter:
+    """Liefert den (prozessweit geteilten) RateLimiter eines Providers."""
+    if provider not in _limiters:
+        _limiters[provider] = RateLimiter(rpm=rpm, tpm=tpm)
+    return _limiters[provider]
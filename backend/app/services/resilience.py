@@ -0,0 +1,123 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import random
+import time
+
+import httpx
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10.0
+
+
+class CircuitOpenError(httpx.ConnectError):
+    """Der Media-Server gilt als nicht erreichbar, Anfragen werden sofort abgelehnt"""
+    pass
+
+
+def is_transient(error: Exception) -> bool:
+    """Netzwerkfehler/Timeouts und 5xx lohnen eine Wiederholung"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def is_connect_error(error: Exception) -> bool:
+    """Fehler beim Verbindungsaufbau: die Anfrage hat den Server sicher nicht erreicht"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponentielles Backoff mit Jitter (attempt ab 0)"""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * (0.5 + random.random())
+
+
+class CircuitBreaker:
+    """
+    Circuit Breaker je Media-Server: nach `failure_threshold` aufeinander
+    folgenden Fehlern ist er `open` und lehnt Anfragen für `reset_timeout`
+    Sekunden sofort ab (z. B. während der Server neu startet). Danach ist er
+    `half_open` und lässt eine Probe-Anfrage durch; Erfolg schließt ihn wieder.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._probing = False
+
+    @property
+    def probing(self) -> bool:
+        """Eine Probe-Anfrage läuft gerade (half_open)"""
+        return self.state == self.HALF_OPEN and self._probing
+
+    def before(self, url: str = '') -> bool:
+        """
+        Vor jeder Anfrage: wirft CircuitOpenError, solange der Breaker offen ist.
+        Liefert True, wenn die Anfrage die Probe im Zustand half_open ist.
+        """
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.OPEN or self.probing:
+            self.rejected += 1
+            raise CircuitOpenError(f"Media server unavailable (circuit open): {url or self.last_error}")
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+            return True
+        return False
+
+    @contextmanager
+    def guard(self, url: str = '') -> Iterator[None]:
+        """
+        `before` für einen Anfrageblock: endet die Probe ohne `success`/`failure`
+        (Abbruch, 4xx, Generator geschlossen), darf die nächste Anfrage proben.
+        """
+        probe = self.before(url)
+        try:
+            yield
+        finally:
+            if probe:
+                self._probing = False
+
+    def success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def failure(self, error: Exception) -> None:
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def as_dict(self) -> dict:
+        result: dict = {"state": self.state, "failures": self.failures, "rejected": self.rejected,
+                        "last_error": self.last_error}
+        if self.state == self.OPEN:
+            result["retry_in"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        return result
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(base_url: str, failure_threshold: int = 5, reset_timeout: float = 30) -> CircuitBreaker:
+    """Liefert den (prozessweit geteilten) CircuitBreaker eines Media-Servers."""
+    if base_url not in _breakers:
+        _breakers[base_url] = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    return _breakers[base_url]
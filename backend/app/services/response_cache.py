@@ -0,0 +1,98 @@
+from __future__ import annotations
+from typing import Any, Callable, Optional, TypeVar
+import hashlib
+import time
+
+import httpx
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class CachedResponse(BaseModel):
+    value: Any
+    digest: str
+    size: int
+    parse_time: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    """
+    Merkt sich je Endpoint und Parametern die letzte Antwort des Media-Servers
+    samt geparstem Ergebnis. Liefert der Server ETag/Last-Modified, wird
+    bedingt abgefragt (304 = kein Download); sonst wird bei gleichem Body-Hash
+    nicht erneut geparst.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple, CachedResponse] = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.bytes_saved = 0
+        self.parse_saved = 0.0
+
+    @staticmethod
+    def key(endpoint: str, params: dict) -> tuple:
+        return (endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+    def headers(self, key: tuple) -> dict[str, str]:
+        """Header für eine bedingte Anfrage"""
+        headers: dict[str, str] = {}
+        if entry := self._entries.get(key):
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def resolve(self, key: tuple, response: httpx.Response, parse: Callable[[str], T]) -> T:
+        """Ergebnis aus dem Cache (304 / gleicher Hash) oder neu geparst"""
+        self.requests += 1
+        entry = self._entries.get(key)
+        if entry and response.status_code == httpx.codes.NOT_MODIFIED:
+            self.not_modified += 1
+            self.bytes_saved += entry.size
+            self.parse_saved += entry.parse_time
+            return entry.value
+        response.raise_for_status()
+        digest = hashlib.sha1(response.content).hexdigest()
+        if entry and entry.digest == digest:
+            self.unchanged += 1
+            self.parse_saved += entry.parse_time
+            return entry.value
+        started = time.perf_counter()
+        value = parse(response.text)
+        self._entries[key] = CachedResponse(
+            value=value,
+            digest=digest,
+            size=len(response.content),
+            parse_time=time.perf_counter() - started,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        return value
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "bytes_saved": self.bytes_saved,
+            "parse_saved_ms": round(self.parse_saved * 1000, 1),
+        }
+
+
+_caches: dict[str, ResponseCache] = {}
+
+
+def response_cache(base_url: str) -> ResponseCache:
+    """Liefert den (prozessweit geteilten) ResponseCache eines Media-Servers."""
+    if base_url not in _caches:
+        _caches[base_url] = ResponseCache()
+    return _caches[base_url]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+from typing import Optional
+import asyncio
+import logging
+import random
+
+from .mediasrv_ctrl import AsyncMS_Controller
+from .my_types import EPG, TimerResult
+from .services.ms_types import MS_Timer
+from .services.resilience import is_connect_error
+from .timer_index import TimerIndex
+from .utils import dt2str
+from .xstr import remove_umlaute
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 0.5
+
+
+class BulkTimerCreator:
+    """
+    Legt Timer für viele EPGs mit max. `concurrency` gleichzeitigen Anfragen an.
+
+    Bereits vorhandene Timer (`find_timer`) werden übersprungen, eine Antwort
+    mit `x-already-covered` gilt als Erfolg. `timeradd` ist nicht idempotent:
+    wiederholt wird nur, wenn die Verbindung gar nicht zustande kam (sonst
+    könnte der Server den Timer schon angelegt haben).
+    """
+
+    def __init__(self, ms_ctrl: AsyncMS_Controller, concurrency: int = 4, max_retries: int = 2,
+                 pre: int = 5, post: int = 5):
+        self.ms_ctrl = ms_ctrl
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.pre = pre
+        self.post = post
+
+    def _result(self, epg: EPG, status: str, attempts: int = 0, error: Optional[str] = None) -> TimerResult:
+        return TimerResult(real_id=epg.real_id, title=epg.title, tv_name=epg.tv_name, start=dt2str(epg.start),
+                           status=status, attempts=attempts, error=error)  # type: ignore
+
+    async def _add(self, epg: EPG, semaphore: asyncio.Semaphore) -> TimerResult:
+        attempt = 0
+        async with semaphore:
+            while True:
+                attempt += 1
+                try:
+                    answer = await self.ms_ctrl.timer_add(epg, title=remove_umlaute(epg.title),
+                                                          pre=self.pre, post=self.post)
+                except Exception as e:
+                    if is_connect_error(e) and attempt <= self.max_retries:
+                        delay = RETRY_BASE_DELAY * 2 ** (attempt - 1) * (0.5 + random.random())
+                        logger.warning("Timer %s: %s, retry %d in %.1fs", epg.title, e, attempt, delay)
+                        await asyncio.sleep(delay)
+                        continue
+                    logger.error("Timer failed %s %s %s: %s", epg.tv_name, dt2str(epg.start), epg.title, e)
+                    return self._result(epg, 'failed', attempt, str(e) or type(e).__name__)
+                break
+        if answer.get('duperror'):
+            logger.info("Timer already covered %s %s %s", epg.tv_name, dt2str(epg.start), epg.title)
+            return self._result(epg, 'covered', attempt)
+        logger.info("Timer created %s %s %s", epg.tv_name, dt2str(epg.start), epg.title)
+        return self._result(epg, 'created', attempt)
+
+    async def create(self, epgs: list[EPG], timers: list[MS_Timer]) -> list[TimerResult]:
+        """Legt die Timer an, liefert je EPG ein Ergebnis (Reihenfolge wie `epgs`)"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: list[Optional[TimerResult]] = [None] * len(epgs)
+        pending: dict[int, asyncio.Task] = {}
+        seen: set[str] = set()
+        index = TimerIndex(timers)
+        for idx, epg in enumerate(epgs):
+            if epg.real_id in seen:
+                logger.info("Duplicate movie entry %s %s %s", epg.tv_name, dt2str(epg.start), epg.title)
+                results[idx] = self._result(epg, 'duplicate')
+                continue
+            seen.add(epg.real_id)
+            if index.find(epg):
+                logger.info("Timer already exists %s %s %s", epg.tv_name, dt2str(epg.start), epg.title)
+                results[idx] = self._result(epg, 'exists')
+                continue
+            pending[idx] = asyncio.create_task(self._add(epg, semaphore))
+        for idx, result in zip(pending, await asyncio.gather(*pending.values())):
+            results[idx] = result
+        return results  # type: ignore
@@ -0,0 +1,55 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from .my_types import EPG
+from .services.ms_types import MS_Timer
+
+
+def covers(timer: MS_Timer, epg: EPG) -> bool:
+    """True, wenn der Timer die gesamte Sendung aufnimmt"""
+    maxstart = max(timer.start_datetime, epg.start)
+    minstop = min(timer.stop_datetime, epg.stop)
+    duration = int((minstop - maxstart).total_seconds() / 60)
+    percent = duration / epg.duration if epg.duration else 0
+    return percent >= 1
+
+
+class TimerIndex:
+    """
+    Timer je `channel_id`, nach Startzeit sortiert. Ein Timer kann ein EPG
+    nur enthalten, wenn er höchstens die längste Timerdauer des Kanals vor
+    dem EPG beginnt; per `bisect` werden nur diese Timer geprüft.
+
+    Treffer kommen wie bei `find_timer` in der Reihenfolge von `timers`.
+    Einmal je Lauf aufbauen und für alle EPGs verwenden.
+    """
+
+    def __init__(self, timers: list[MS_Timer]):
+        self.timers = timers
+        grouped: dict[str, list[tuple[datetime, int, MS_Timer]]] = {}
+        for pos, timer in enumerate(timers):
+            grouped.setdefault(timer.channel_id, []).append((timer.start_datetime, pos, timer))
+        self._starts: dict[str, list[datetime]] = {}
+        self._entries: dict[str, list[tuple[int, MS_Timer]]] = {}
+        self._maxduration: dict[str, timedelta] = {}
+        for channel_id, entries in grouped.items():
+            entries.sort(key=lambda entry: entry[0])
+            self._starts[channel_id] = [start for start, _, _ in entries]
+            self._entries[channel_id] = [(pos, timer) for _, pos, timer in entries]
+            self._maxduration[channel_id] = timedelta(minutes=max(timer.duration for _, _, timer in entries))
+
+    def running(self, epg: EPG) -> list[MS_Timer]:
+        """Timer des Kanals, die beim Start des EPGs laufen"""
+        starts = self._starts.get(epg.tv_channel)
+        if not starts:
+            return []
+        lo = bisect_left(starts, epg.start - self._maxduration[epg.tv_channel])
+        hi = bisect_right(starts, epg.start)
+        found = sorted(entry for entry in self._entries[epg.tv_channel][lo:hi]
+                       if epg.start < entry[1].stop_datetime)
+        return [timer for _, timer in found]
+
+    def find(self, epg: EPG) -> list[MS_Timer]:
+        """Timer, die das EPG vollständig aufnehmen (wie `find_timer`)"""
+        return [timer for timer in self.running(epg) if covers(timer, epg)]
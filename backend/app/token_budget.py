@@ -0,0 +1,100 @@
+from __future__ import annotations
+from typing import Any, Optional
+import logging
+
+from .utils import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceededError(Exception):
+    """Das Token-Budget des Laufs ist aufgebraucht"""
+    pass
+
+
+class TokenBudget:
+    """
+    Zählt Tokens und Kosten der LLM-Anfragen eines Laufs.
+
+    Vor jeder Anfrage wird der Prompt mit tiktoken geschätzt und reserviert;
+    würde das Budget `max_tokens` (inkl. laufender Anfragen) überschritten,
+    gibt es einen BudgetExceededError. Nach der Anfrage zählen die Werte aus
+    `completion.usage` (falls geliefert).
+    Preise in USD pro 1 Mio. Tokens.
+    """
+
+    def __init__(self, model: str, max_tokens: Optional[int] = None,
+                 prompt_price: float = 0.0, completion_price: float = 0.0):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated_tokens = 0
+        self.rejected = 0
+        self.reserved = 0  # Schätzung der laufenden Anfragen
+        self._tokenizer_ok = True
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def cost(self) -> float:
+        return (self.prompt_tokens * self.prompt_price + self.completion_tokens * self.completion_price) / 1_000_000
+
+    def _estimate(self, messages: list[dict[str, str]]) -> int:
+        if self._tokenizer_ok:
+            try:
+                return count_message_tokens(messages, model_name=self.model)
+            except Exception as e:
+                # tiktoken lädt die Encodings beim ersten Mal aus dem Netz
+                logger.warning("Tokenizer not available, estimating 4 chars per token: %s", e)
+                self._tokenizer_ok = False
+        return sum(len(m.get("content", "")) for m in messages) // 4 + 4 * len(messages) + 2
+
+    def check(self, messages: list[dict[str, str]]) -> int:
+        """Schätzt den Prompt und prüft das Budget, liefert die Schätzung"""
+        estimate = self._estimate(messages)
+        if self.max_tokens and self.total_tokens + self.reserved + estimate > self.max_tokens:
+            self.rejected += 1
+            if self.rejected == 1:
+                logger.warning("Token budget of %d exhausted (%d used), no further LLM requests",
+                               self.max_tokens, self.total_tokens)
+            raise BudgetExceededError(f"Token budget {self.max_tokens} exhausted")
+        self.estimated_tokens += estimate
+        self.reserved += estimate
+        return estimate
+
+    def release(self, estimate: int) -> None:
+        """Gibt die Reservierung einer fehlgeschlagenen Anfrage frei"""
+        self.reserved -= estimate
+
+    def add(self, usage: Any, estimate: int = 0, answer: Optional[str] = None) -> None:
+        """
+        Übernimmt `completion.usage`; ohne usage zählt die Schätzung
+        (bei Streams zusätzlich die Schätzung des gesamten gelesenen Texts `answer`)
+        """
+        self.reserved -= estimate
+        self.requests += 1
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+        else:
+            self.prompt_tokens += estimate
+            if answer:
+                self.completion_tokens += self._estimate([{"content": answer}])
+
+    def as_dict(self) -> dict:
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_prompt_tokens": self.estimated_tokens,
+            "budget": self.max_tokens,
+            "rejected": self.rejected,
+            "cost": round(self.cost, 4),
+        }
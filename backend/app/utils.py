@@ -1,7 +1,7 @@
 import sys
 from datetime import datetime, timedelta
 import json
-from functools import wraps
+from functools import lru_cache, wraps
 import time
 import tiktoken
 from collections import defaultdict
@@ -174,8 +174,16 @@ def async_time_it(func):
 MODEL_NAME = "gpt-5"
 # nano_tokenizer = tiktoken.encoding_for_model("gpt-4-1-nano")
 
+@lru_cache(maxsize=16)
+def get_tokenizer(model_name:str=MODEL_NAME) -> tiktoken.Encoding:
+    """Encoder je Modell, einmal erzeugt; unbekannte Modelle (ollama, gemini ...) nutzen o200k_base"""
+    try:
+        return tiktoken.encoding_for_model(model_name=model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
 def count_message_tokens(messages, model_name=MODEL_NAME):
-    tokenizer = tiktoken.encoding_for_model(model_name=model_name)
+    tokenizer = get_tokenizer(model_name)
     total_tokens = 0
     for message in messages:
         # Rolle (role), Name (optional) und Content zählen
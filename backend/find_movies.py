@@ -22,7 +22,7 @@ import httpx
 import click
 from dotenv import load_dotenv
 
-from app.factory import  create_sync_chat_client
+from app.factory import  create_sync_chat_client, filter_order, category_cache, epg_snapshot
 from app.chat_prompts import epg_content_prompt
 from app.filter import (
     TitleBlacklstFilter,
@@ -32,16 +32,21 @@ from app.filter import (
     HasTimerFilter,
     DaysFilter,
 )
-from app.mediasrv_ctrl import MS_Controller, MS_ControllerBase
+from app.mediasrv_ctrl import MS_Controller
 from app.services.ms_service import MediaServer, MockMediaServer
-from app.my_types import EPG, EPGFilter
-from backend.app.chat_ctrl import shrink_epg
+from app.my_types import EPG, EPGFilter, FilterRejection
+from app.epg_categorie import preclassify
+from backend.app.chat_ctrl import shrink_epg, group_epgs
 from app.utils import read_jsonl, write_jsonl
+from app.category_cache import CategoryCache
+from app.filter_engine import run_filters
+from app.timer_index import TimerIndex
+from app.batch_ctrl import BatchCategorizer
 from app.xstr import remove_umlaute
 import app.config as cfg
 from app.epgfilter_ctrl import base_filters
-from app.services.chat_service import AsyncChatClient, ChatClient
-from backend.app.factory import create_sync_controller
+from app.services.chat_service import AsyncChatClient, ChatClient, ChatRequestError
+from backend.app.factory import create_sync_controller, media_server_breaker
 
 
 # ----------------- Bootstrap -----------------
@@ -52,6 +57,8 @@ cfg.init_config()
 
 data_path = Path(cfg.settings.data_folder)
 std_movies_path = data_path / "movies_epgs.jsonl"
+rejected_epgs_path = data_path / "rejected_epgs.jsonl"
+batch_path = data_path / "batch_requests.jsonl"
 logpath: str = cfg.settings.log_folder or cfg.settings.data_folder or "./logs"
 logfilename = Path(logpath) / "app.log"
 
@@ -72,10 +79,12 @@ stream_handler = logging.StreamHandler()  # wird nur bei --output hinzugefügt
 
 # ---------------- Business-Logic -------------
 class Chat4ContentInfo:
-    def __init__(self, client:ChatClient, prompttxt: str, model: Optional[str] = None):
+    def __init__(self, client:ChatClient, prompttxt: str, model: Optional[str] = None,
+                 cache: Optional[CategoryCache] = None):
         self.client = client
         self.model = model or cfg.settings.ai_model
         self.prompttxt = prompttxt
+        self.cache = cache
 
     def _chat(self, epg: EPG) -> str:
 
@@ -104,9 +113,15 @@ class Chat4ContentInfo:
     def get_category(self, epg: EPG) -> list[str]:
         if epg.contentinfo:
             return epg.contentinfo
+        key = epg.hash
+        if self.cache is not None and (category := self.cache.get(key)):
+            logger.info("Cache: %s > %s", category, epg.title)
+            return [category]
         try:
             category = self._chat(epg)
             logger.info("ChatBot: %s > %s", category, epg.title)
+            if self.cache is not None:
+                self.cache.put(key, category, model=self.model)
             return [category]
         except Exception as e:
             logger.error(f"Error getting category for {epg.title}: {e}")
@@ -116,15 +131,38 @@ class Chat4ContentInfo:
 def add_content_category(
     client, epgs: list[EPG], model: Optional[str] = None
 ) -> list[EPG]:
-    bot = Chat4ContentInfo(client=client, prompttxt=epg_content_prompt, model=model)
+    cache = category_cache(cfg.settings)
+    bot = Chat4ContentInfo(client=client, prompttxt=epg_content_prompt, model=model, cache=cache)
+    pending = [epg for epg in epgs if not epg.contentinfo]
+    if cfg.settings.ai_preclassify:
+        pending = preclassify(pending)
+    groups = group_epgs(pending)
+    logger.info("Dedup: %d EPGs in %d groups", sum(len(group) for group in groups), len(groups))
     idx = 0
-    for epg in epgs:
-        if epg.contentinfo:
-            continue
+    for group in groups:
         idx += 1
         print(f"\r{idx:3}  ", end="", flush=True)
-        epg.contentinfo.extend(bot.get_category(epg))
+        category = bot.get_category(group[0])
+        for epg in group:
+            epg.contentinfo.extend(category)
     print()
+    logger.info("Category cache: %d hits, %d misses", cache.hits, cache.misses)
+    cache.close()
+    return epgs
+
+
+def batch_content_category(
+    client: ChatClient, epgs: list[EPG], model: Optional[str] = None, poll: float = 60
+) -> list[EPG]:
+    """Wie add_content_category, aber als Batch-Job über die Batch-API des Providers."""
+    cache = category_cache(cfg.settings)
+    categorizer = BatchCategorizer(client=client, prompttxt=epg_content_prompt, model=model, cache=cache)
+    try:
+        categorizer.categorize(epgs, filepath=batch_path, poll=poll)
+    except (ChatRequestError, TimeoutError) as e:
+        logger.error("Batch categorization failed: %s", e)
+    logger.info("Category cache: %d hits, %d misses", cache.hits, cache.misses)
+    cache.close()
     return epgs
 
 def get_usr_filters(path:Path) -> Generator[EPGFilter, None, None]:
@@ -138,10 +176,16 @@ def get_usr_filters(path:Path) -> Generator[EPGFilter, None, None]:
             yield filter
 
 
-def collect_movies(dest: Optional[str] = None, model: Optional[str] = None) -> int:
+def collect_movies(dest: Optional[str] = None, model: Optional[str] = None,
+                   batch: bool = False, poll: float = 60) -> int:
 
     movies_path = Path(dest) if dest else std_movies_path
-    with create_sync_controller(cfg.settings.server_url, debug=False) as ms_ctrl:
+    with create_sync_controller(cfg.settings.server_url, debug=False,
+                                channel_ttl=cfg.settings.channel_cache_ttl,
+                                timeouts=cfg.settings.ms_timeouts,
+                                retries=cfg.settings.ms_retries,
+                                breaker=media_server_breaker(cfg.settings),
+                                connect_timeout=cfg.settings.http_connect_timeout) as ms_ctrl:
         epgs:list[EPG] = []
         try:
             epgs = ms_ctrl.fetch_epgs(favonly=True)
@@ -149,8 +193,16 @@ def collect_movies(dest: Optional[str] = None, model: Optional[str] = None) -> i
             logger.error(str(e))
             raise HTTPException(status_code=503, detail=f"Connection Error: {cfg.settings.server_url}")
 
+        # unveränderte EPGs übernehmen die Kategorien des letzten Laufs
+        snapshot = epg_snapshot(cfg.settings)
+        if snapshot:
+            snapshot.apply(epgs)
+        fetched = epgs
         timers = ms_ctrl.fetch_timers()
-        epgs = MS_ControllerBase.filter_epgs(epgs=epgs, filters=base_filters(cfg.settings, timers=timers))
+        logger.info("Media server response cache: %s", ms_ctrl.ms_server.responses.stats())
+        rejections: list[FilterRejection] = []
+        epgs = run_filters(epgs, base_filters(cfg.settings, timers=timers), "Base filter", rejections,
+                           order=filter_order(cfg.settings))
         epgs = sorted(epgs, key=lambda epg: epg.start)
         logger.info("After Filters, found EPGs: %d", len(epgs))
         try:
@@ -159,24 +211,36 @@ def collect_movies(dest: Optional[str] = None, model: Optional[str] = None) -> i
             logger.info("%s, %s", info.get("provider"), info.get("model"))
             logger.info("add content categories ...")
             no_contentlst = [epg for epg in epgs if not epg.contentinfo]
-            add_content_category(client=client, epgs=no_contentlst, model=model)
-            epgs = ms_ctrl.apply_filter(epgs, epgfilter=ContentMovieFilter())
+            if batch:
+                if cfg.settings.ai_preclassify:
+                    no_contentlst = preclassify(no_contentlst)
+                batch_content_category(client=client, epgs=no_contentlst, model=model, poll=poll)
+            else:
+                add_content_category(client=client, epgs=no_contentlst, model=model)
+            epgs = run_filters(epgs, [ContentMovieFilter()], "Movie filter", rejections)
         except ValueError as e:
             logger.error(e)
             logger.warning("AI model not configured, skipping content categorization ...")
             # continue without llm support
             # raise HTTPException(status_code=500, detail=str(e))
         logger.info("After LLM, found EPGs: %d", len(epgs))
+        if snapshot:
+            snapshot.save(fetched)
         usr_filters = list(get_usr_filters(Path(cfg.settings.plugin_folder)))
         if usr_filters:
             logger.info("Applying %d user filters ...", len(usr_filters))
-            epgs = MS_ControllerBase.filter_epgs(epgs=epgs, filters=usr_filters)
+            epgs = run_filters(epgs, usr_filters, "User filter", rejections)
         logger.info("After user filters, found EPGs: %d", len(epgs))
         epgs = sorted(epgs, key=lambda epg: epg.start)
         write_jsonl(
             filepath=movies_path,
             data=[epg.model_dump(mode="json", exclude_none=True) for epg in epgs],
         )
+        write_jsonl(
+            filepath=rejected_epgs_path,
+            data=[rejection.model_dump(mode="json") for rejection in rejections],
+        )
+        logger.info("%d rejected EPGs saved to %s", len(rejections), rejected_epgs_path)
         logger.info(f"{len(epgs)} Movies saved to %s", movies_path)
         return len(epgs)
 
@@ -196,10 +260,12 @@ def create_timers(src: Optional[str] = None) -> None:
         post = cfg.settings.timerparameters.get("post", 5)
     count = 0
     with httpx.Client() as http:
-        media_server = MediaServer(httpclient=http,url=cfg.settings.server_url)
+        media_server = MediaServer(httpclient=http,url=cfg.settings.server_url,
+                                   timeouts=cfg.settings.ms_timeouts,
+                                   connect_timeout=cfg.settings.http_connect_timeout)
         ms_ctrl = MS_Controller(ms_server=media_server)        
 
-        timers = ms_ctrl.fetch_timers()
+        timers = TimerIndex(ms_ctrl.fetch_timers())
         for epg in moviesepglst:
             if ms_ctrl.find_timer(epg, timers=timers):
                 logger.info(
@@ -247,9 +313,21 @@ def cli(ctx, output: bool, debug: bool):
     "--model",
     help="LLM-Modell, das für die Kategorisierung verwendet wird.",
 )
-def collect(dest: Optional[Path], model: Optional[str]) -> None:
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Kategorisierung als Batch-Job über die Batch-API des Providers (langsamer, günstiger).",
+)
+@click.option(
+    "--poll",
+    type=float,
+    default=60,
+    show_default=True,
+    help="Abfrageintervall in Sekunden für den Batch-Status.",
+)
+def collect(dest: Optional[Path], model: Optional[str], batch: bool, poll: float) -> None:
     """Filme sammeln und kategorisieren."""
-    collect_movies(dest=str(dest) if dest else None, model=model)
+    collect_movies(dest=str(dest) if dest else None, model=model, batch=batch, poll=poll)
 
 
 
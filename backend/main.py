@@ -2,6 +2,8 @@
 """
 FastAPI-Wrapper für das bestehende Modul.
 """
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import logging
 import json
@@ -16,9 +18,9 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from app.factory import create_async_chat_client,create_async_controller
+from app.factory import create_async_chat_client,create_async_controller,create_http_client,media_server_breaker,filter_order,category_cache,epg_snapshot
 
-from app.chat_prompts import epg_content_prompt
+from app.chat_prompts import epg_content_prompt, epg_content_batch_prompt
 from app.filter import (
     TitleBlacklstFilter,
     ContentMovieFilter,
@@ -29,13 +31,17 @@ from app.filter import (
     IsTVChannelFilter
 )
 from app.epgfilter_ctrl import base_filters
-from app.mediasrv_ctrl import AsyncMS_Controller, MS_Controller, MS_ControllerBase
-from app.services.ms_service import AsyncMediaServer, MediaServer, MockMediaServer
-from app.services.chat_service import AsyncChatClient, ChatClient, ChatRequestError
-from app.my_types import EPG
-from app.chat_ctrl import shrink_epg
+from app.mediasrv_ctrl import MS_Controller
+from app.services.ms_service import MediaServer, MockMediaServer
+from app.services.chat_service import AsyncChatClient, ChatClient, ChatRequestError, FailoverChatClient
+from app.my_types import EPG, FilterRejection, TimerResult
+from app.timer_ctrl import BulkTimerCreator
+from app.epg_categorie import preclassify
+from app.chat_ctrl import shrink_epg, epg_batches, parse_batch_answer, group_epgs
+from app.category_cache import CategoryCache
+from app.filter_engine import run_filters
+from app.token_budget import TokenBudget, BudgetExceededError
 from app.utils import read_jsonl, write_jsonl,dt2str
-from app.xstr import remove_umlaute
 import app.config as cfg
 from app.services.ms_types import MS_Timer
 import importlib.util
@@ -50,6 +56,7 @@ cfg.init_config()
 
 data_path = Path(cfg.settings.data_folder)
 std_movies_path = data_path / "movies_epgs.jsonl"
+rejected_epgs_path = data_path / "rejected_epgs.jsonl"
 collected_epgs_path = data_path / "collected_epgs.jsonl"
 logpath: str = cfg.settings.log_folder or cfg.settings.data_folder
 logfilename = Path(logpath) / "app.log"
@@ -81,7 +88,20 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 # ----------------- FastAPI Setup -----------------
-app = FastAPI(title="Movie Timer API", version="1.0.0")
+# Connection-Pool für Media-Server und LLM, lebt so lange wie der Prozess
+http_pool: Optional[httpx.AsyncClient] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_pool
+    http_pool = create_http_client(cfg.settings)
+    try:
+        yield
+    finally:
+        await http_pool.aclose()
+        http_pool = None
+
+app = FastAPI(title="Movie Timer API", version="1.0.0", lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # CORS konfigurieren (bleibt nützlich, falls Sie die API doch mal von woanders ansprechen)
@@ -100,11 +120,14 @@ class Info(BaseModel):
     running: bool
     run_started: Optional[str] = None
     run_progress: Optional[float] = None
+    ai_usage: Optional[dict] = None
+    media_server: Optional[dict] = None
 
 
 class TimerStatus(BaseModel):
     created_timers: int
     message: str
+    results: List[TimerResult] = []
 
 class MovieList(BaseModel):
     movies: List[dict]
@@ -133,6 +156,28 @@ infostatus = Info(count=0, running=False)
 def movies_path() -> Path:
     return std_movies_path
 
+def controller_options() -> dict:
+    """Einstellungen für create_async_controller (Pool, Caches, Resilienz)"""
+    return {
+        "shard_size": cfg.settings.epg_shard_size,
+        "shard_concurrency": cfg.settings.epg_shard_concurrency,
+        "channel_ttl": cfg.settings.channel_cache_ttl,
+        "httpclient": http_pool,
+        "timeouts": cfg.settings.ms_timeouts,
+        "retries": cfg.settings.ms_retries,
+        "breaker": media_server_breaker(cfg.settings),
+        "connect_timeout": cfg.settings.http_connect_timeout,
+    }
+
+
+def token_budget(model: str) -> TokenBudget:
+    return TokenBudget(
+        model=model,
+        max_tokens=cfg.settings.ai_token_budget,
+        prompt_price=cfg.settings.ai_price.get("prompt", 0.0),
+        completion_price=cfg.settings.ai_price.get("completion", 0.0),
+    )
+
 def read_movies() -> list[dict]:
     """Liest die Filmliste aus der JSONL-Datei."""
     if not movies_path().exists():
@@ -141,10 +186,35 @@ def read_movies() -> list[dict]:
 
 
 class Chat4ContentInfo:
-    def __init__(self, client: AsyncChatClient, prompttxt: str, model: Optional[str] = None):
+    def __init__(self, client: AsyncChatClient | FailoverChatClient, prompttxt: str, model: Optional[str] = None,
+                 cache: Optional[CategoryCache] = None, batch_prompttxt: str = epg_content_batch_prompt,
+                 budget: Optional[TokenBudget] = None):
         self.client = client
         self.model = model or cfg.settings.ai_model
         self.prompttxt = prompttxt
+        self.batch_prompttxt = batch_prompttxt
+        self.cache = cache
+        self.budget = budget
+
+    async def _ask(self, messages: list[dict[str, str]]) -> str:
+        estimate = self.budget.check(messages) if self.budget else 0
+        try:
+            if self.client.stream:
+                # Stream wird nach dem ersten vollständigen JSON-Wert abgebrochen
+                answer = await self.client.ask_stream(messages=messages, model=self.model)
+            else:
+                completion = await self.client.ask(messages=messages, model=self.model)
+        except BaseException:
+            if self.budget:
+                self.budget.release(estimate)
+            raise
+        if self.client.stream:
+            if self.budget:
+                self.budget.add(answer.usage, estimate, answer=answer.text)
+            return answer.content
+        if self.budget:
+            self.budget.add(completion.usage, estimate)
+        return self.client.get_result_content(completion=completion)
 
     async def _chat(self, epg: EPG) -> str:
         sepg = shrink_epg(epg)
@@ -153,11 +223,61 @@ class Chat4ContentInfo:
             "role": "user",
             "content": self.prompttxt.replace("<EPGENTRY>", json.dumps(jsonstr, ensure_ascii=False)),
         }
-        completion = await self.client.ask(messages=[usr_msg], model=self.model)
-        json_result = self.client.get_result_content(completion=completion)
+        json_result = await self._ask(messages=[usr_msg])
         answer: dict = json.loads(json_result.strip())
         return str(answer.get("category", "Other"))
 
+    async def _chat_batch(self, epgs: list[EPG]) -> dict[int, str]:
+        entries = [
+            shrink_epg(epg).model_dump(mode="json", exclude_none=True, exclude_defaults=True)
+            for epg in epgs
+        ]
+        usr_msg = {
+            "role": "user",
+            "content": self.batch_prompttxt.replace("<EPGENTRIES>", json.dumps(entries, ensure_ascii=False)),
+        }
+        return parse_batch_answer(await self._ask(messages=[usr_msg]))
+
+    async def _chat_split(self, epgs: list[EPG], skipped: set[int]) -> dict[int, str]:
+        """
+        Batch-Anfrage; ist die Antwort unbrauchbar, wird der Batch halbiert.
+        Fehler betreffen nur den jeweiligen Teil-Batch, bereits erhaltene
+        Antworten bleiben erhalten. Ist das Token-Budget aufgebraucht, werden
+        die eventids der nicht mehr gestellten Anfragen in `skipped` vermerkt.
+        """
+        if len(epgs) == 1:
+            try:
+                return {epgs[0].eventid: await self._chat(epgs[0])}
+            except BudgetExceededError:
+                skipped.add(epgs[0].eventid)
+                return {}
+            except Exception as e:
+                logger.error(f"Error getting category for {epgs[0].title}: {e}")
+                return {}
+        try:
+            answers = await self._chat_batch(epgs)
+        except ValueError as e:  # json.JSONDecodeError ist ein ValueError
+            logger.warning("Batch of %d not parsable, splitting: %s", len(epgs), e)
+            answers = {}
+        except BudgetExceededError:
+            skipped.update(epg.eventid for epg in epgs)
+            return {}
+        except Exception as e:
+            # Anfrage selbst fehlgeschlagen (nach Wiederholungen) -> nicht aufteilen
+            logger.error(f"Error getting categories for batch of {len(epgs)}: {e}")
+            return {}
+        missing = [epg for epg in epgs if epg.eventid not in answers]
+        if not missing:
+            return answers
+        if len(missing) == len(epgs):
+            half = len(epgs) // 2
+            for part in await asyncio.gather(self._chat_split(epgs[:half], skipped),
+                                             self._chat_split(epgs[half:], skipped)):
+                answers.update(part)
+        else:
+            answers.update(await self._chat_split(missing, skipped))
+        return answers
+
 
     # async def __call__(self, epg: EPG) -> list[str]:
     #     if epg.contentinfo:
@@ -169,43 +289,132 @@ class Chat4ContentInfo:
     async def get_category(self, epg: EPG) -> list[str]:
         if epg.contentinfo:
             return epg.contentinfo
+        key = epg.hash
+        if self.cache is not None and (category := self.cache.get(key)):
+            logger.info("Cache: %s > %s", category, epg.title)
+            return [category]
         try:
             category = await self._chat(epg)
             logger.info("ChatBot: %s > %s", category, epg.title)
+            if self.cache is not None:
+                self.cache.put(key, category, model=self.model)
             return [category]
+        except BudgetExceededError:
+            # ohne Kategorie entscheidet später der DVB-Content-Code
+            return []
         except Exception as e:
             logger.error(f"Error getting category for {epg.title}: {e}")
             return ["Other"]
 
+    async def get_categories(self, epgs: list[EPG]) -> list[list[str]]:
+        """Wie get_category, aber für mehrere EPGs in einer Anfrage."""
+        result: list[list[str]] = [epg.contentinfo for epg in epgs]
+        pending: list[EPG] = []
+        for idx, epg in enumerate(epgs):
+            if result[idx]:
+                continue
+            if self.cache is not None and (category := self.cache.get(epg.hash)):
+                logger.info("Cache: %s > %s", category, epg.title)
+                result[idx] = [category]
+            else:
+                pending.append(epg)
+        if not pending:
+            return result
+        skipped: set[int] = set()
+        answers = await self._chat_split(pending, skipped)
+        for idx, epg in enumerate(epgs):
+            if result[idx]:
+                continue
+            if (category := answers.get(epg.eventid)):
+                logger.info("ChatBot: %s > %s", category, epg.title)
+                if self.cache is not None:
+                    self.cache.put(epg.hash, category, model=self.model)
+                result[idx] = [category]
+            elif epg.eventid in skipped:
+                # ohne Kategorie entscheidet später der DVB-Content-Code
+                result[idx] = []
+            else:
+                result[idx] = ["Other"]
+        return result
+
 
 
 
 
 async def add_content_category(
-            client: AsyncChatClient, 
-            epgs: list[EPG], 
-            model: Optional[str] = None
+            client: AsyncChatClient | FailoverChatClient,
+            epgs: list[EPG],
+            model: Optional[str] = None,
+            concurrency: Optional[int] = None
         ) -> None:
+    """
+    Kategorisiert die EPGs mit max. `concurrency` gleichzeitigen LLM-Anfragen.
+    Die Ergebnisse werden in der Reihenfolge von `epgs` zugeordnet, der Fortschritt
+    zählt abgeschlossene Anfragen (unabhängig von der Reihenfolge der Antworten).
+    Gleiche Filme (Titel und Beschreibung) werden nur einmal angefragt,
+    eindeutige Fälle löst vorher der regelbasierte Vorab-Klassifikator.
+    """
+    if cfg.settings.ai_preclassify:
+        epgs = preclassify(epgs)
+    groups = group_epgs(epgs)
+    members = {id(group[0]): group for group in groups}
+    logger.info("Dedup: %d EPGs in %d groups, %d requests saved", len(epgs), len(groups), len(epgs) - len(groups))
+    epgs = [group[0] for group in groups]
     lenepgs = len(epgs)
     step = 60 / lenepgs if lenepgs > 0 else 1
-    bot = Chat4ContentInfo(client=client, prompttxt=epg_content_prompt, model=model)
-    idx = 0
-    for epg in epgs:
-        idx += 1
-        logger.info(f"Processing {idx:3} - {epg.title}")
-        infostatus.run_progress = 0.15 + (idx * step / 100)
-        epg.contentinfo.extend(await bot.get_category(epg))
+    cache = category_cache(cfg.settings)
+    budget = token_budget(model=model or client.default_model or '')
+    bot = Chat4ContentInfo(client=client, prompttxt=epg_content_prompt, model=model, cache=cache, budget=budget)
+    semaphore = asyncio.Semaphore(max(1, concurrency or cfg.settings.ai_concurrency))
+    done = 0
+
+    async def categorize(idx: int, epg: EPG) -> list[str]:
+        nonlocal done
+        async with semaphore:
+            logger.info(f"Processing {idx:3} - {epg.title}")
+            category = await bot.get_category(epg)
+        done += 1
+        infostatus.run_progress = 0.15 + (done * step / 100)
+        infostatus.ai_usage = budget.as_dict()
+        return category
+
+    async def categorize_batch(batch: list[EPG]) -> list[list[str]]:
+        nonlocal done
+        async with semaphore:
+            logger.info(f"Processing batch of {len(batch)} - {batch[0].title} ...")
+            categories = await bot.get_categories(batch)
+        done += len(batch)
+        infostatus.run_progress = 0.15 + (done * step / 100)
+        infostatus.ai_usage = budget.as_dict()
+        return categories
+
+    batch_size = cfg.settings.ai_batch_size
+    if batch_size > 1:
+        batches = epg_batches(epgs, size=batch_size)
+        results = await asyncio.gather(*(categorize_batch(batch) for batch in batches))
+        categories = [category for batchresult in results for category in batchresult]
+        epgs = [epg for batch in batches for epg in batch]
+    else:
+        categories = await asyncio.gather(*(categorize(idx, epg) for idx, epg in enumerate(epgs, start=1)))
+    for epg, category in zip(epgs, categories):
+        for member in members[id(epg)]:
+            member.contentinfo.extend(category)
+    logger.info("Category cache: %d hits, %d misses", cache.hits, cache.misses)
+    cache.close()
+    infostatus.ai_usage = budget.as_dict()
+    logger.info("Token usage: %s", infostatus.ai_usage)
 
 
 
 async def collect_movies( model: Optional[str] = None) -> int:
     
-    async with create_async_controller(cfg.settings.server_url, debug=False) as ms_ctrl:
+    async with create_async_controller(cfg.settings.server_url, debug=False, **controller_options()) as ms_ctrl:
         infostatus.running = True
         infostatus.run_started = dt2str(datetime.now())
         infostatus.modified = infostatus.run_started
         infostatus.count = 0
         infostatus.run_progress = 0.05
+        infostatus.ai_usage = None
         try:
             epgs = await ms_ctrl.fetch_epgs(favonly=True)
             # write_jsonl(
@@ -217,32 +426,44 @@ async def collect_movies( model: Optional[str] = None) -> int:
             logger.error(str(e))
             raise HTTPException(status_code=503, detail=f"Connection Error: {cfg.settings.server_url}")
 
+        # unveränderte EPGs übernehmen die Kategorien des letzten Laufs
+        snapshot = epg_snapshot(cfg.settings)
+        if snapshot:
+            snapshot.apply(epgs)
+        fetched = epgs
         timers = await ms_ctrl.fetch_timers()
-        epgs = MS_ControllerBase.filter_epgs(epgs=epgs, filters=base_filters(cfg.settings, timers=timers))
+        logger.info("Media server response cache: %s", ms_ctrl.ms_server.responses.stats())
+        rejections: list[FilterRejection] = []
+        epgs = run_filters(epgs, base_filters(cfg.settings, timers=timers), "Base filter", rejections,
+                           order=filter_order(cfg.settings))
         epgs = sorted(epgs, key=lambda epg: epg.start)
         logger.info("After Filters, found EPGs: %d", len(epgs))
         infostatus.run_progress = 0.15
         try:
-            client = create_async_chat_client(settings=cfg.settings, model=model)
+            client = create_async_chat_client(settings=cfg.settings, model=model, http_client=http_pool)
             info = client.info()
             logger.info("%s, %s", info.get("provider"), info.get("model"))
             logger.info("add content categories ...")
             no_contentlst = [epg for epg in epgs if not epg.contentinfo]
             await add_content_category(client=client, epgs=no_contentlst, model=model)
-            epgs = ms_ctrl.apply_filter(epgs, epgfilter=ContentMovieFilter())
+            for name, latency in client.latency_stats().items():
+                logger.info("Latency %s: %s", name, latency)
+            epgs = run_filters(epgs, [ContentMovieFilter()], "Movie filter", rejections)
         except ValueError as e:
             logger.error(e)
             logger.warning("AI model not configured, skipping content categorization ...")
             # continue without llm support
             # raise HTTPException(status_code=500, detail=str(e))
         logger.info("After LLM, found EPGs: %d", len(epgs))
+        if snapshot:
+            snapshot.save(fetched)
         infostatus.run_progress = 0.8
         pluginpath = Path(cfg.settings.plugin_folder)
         usr_filters = list(get_usr_filters(path=pluginpath))
         logger.info("%d User filters found, Path %s", len(usr_filters), pluginpath)
         if usr_filters:
             logger.info("Applying %d user filters ...", len(usr_filters))
-            epgs = MS_ControllerBase.filter_epgs(epgs=epgs, filters=usr_filters)
+            epgs = run_filters(epgs, usr_filters, "User filter", rejections)
         logger.info("After user filters, found EPGs: %d", len(epgs))
         epgs = sorted(epgs, key=lambda epg: epg.start)
         infostatus.run_progress = 0.9
@@ -250,6 +471,11 @@ async def collect_movies( model: Optional[str] = None) -> int:
             filepath=movies_path(),
             data=[epg.model_dump(mode="json", exclude_none=True) for epg in epgs],
         )
+        write_jsonl(
+            filepath=rejected_epgs_path,
+            data=[rejection.model_dump(mode="json") for rejection in rejections],
+        )
+        logger.info("%d rejected EPGs saved to %s", len(rejections), rejected_epgs_path)
         logger.info(f"{len(epgs)} Movies saved to %s", movies_path())
         infostatus.running = False
         infostatus.run_started = None
@@ -261,7 +487,7 @@ async def collect_movies( model: Optional[str] = None) -> int:
 
 
 
-async def create_timers() -> int:
+async def create_timers() -> list[TimerResult]:
 
     try:
         movies:list[dict] = read_movies()
@@ -276,30 +502,12 @@ async def create_timers() -> int:
         pre = cfg.settings.timerparameters.get("pre", 5)
         post = cfg.settings.timerparameters.get("post", 5)
     
-    count = 0
-    async with httpx.AsyncClient() as http:
-        media_server = AsyncMediaServer(httpclient=http, url=cfg.settings.server_url)
-        ms_ctrl = AsyncMS_Controller(ms_server=media_server)
+    async with create_async_controller(cfg.settings.server_url, **controller_options()) as ms_ctrl:
         
         timers = await ms_ctrl.fetch_timers()
-        for epg in moviesepglst:
-            if MS_ControllerBase.find_timer(epg, timers=timers):
-                logger.info(
-                    "Timer already exists %s %s %s",
-                    epg.tv_name,
-                    dt2str(epg.start),
-                    epg.title,
-                )
-                continue
-            await ms_ctrl.timer_add(epg, title=remove_umlaute(epg.title), pre=pre, post=post)
-            count += 1
-            logger.info(
-                "Timer created %s %s %s",
-                epg.tv_name,
-                dt2str(epg.start),
-                epg.title,
-            )
-        return count
+        creator = BulkTimerCreator(ms_ctrl, concurrency=cfg.settings.timer_concurrency,
+                                   max_retries=cfg.settings.timer_retries, pre=pre, post=post)
+        return await creator.create(moviesepglst, timers=timers)
 
 
 
@@ -320,10 +528,15 @@ async def api_collect( model: Optional[str] = None):
 async def api_createtimer():
     """Timer auf Basis der gesammelten Filme anlegen."""
     try:
-        count = await create_timers()
+        results = await create_timers()
+        counts = {status: sum(1 for r in results if r.status == status)
+                  for status in ("created", "exists", "covered", "duplicate", "failed")}
         return TimerStatus(
-            created_timers=count,
-            message=f"Successfully created {count} timers"
+            created_timers=counts["created"],
+            message=(f"Successfully created {counts['created']} timers, {counts['exists']} existing, "
+                     f"{counts['covered']} already covered, {counts['duplicate']} duplicates, "
+                     f"{counts['failed']} failed"),
+            results=results,
         )
     except Exception as e:
         logger.error(f"Error in createtimer: {str(e)}")
@@ -358,6 +571,7 @@ async def api_update_movies(movies: MovieList):
 @api_router.get("/info", response_model=dict, summary="Status abrufen")
 async def api_get_info():
     """Statusinformationen zur Anwendung abrufen."""
+    infostatus.media_server = media_server_breaker(cfg.settings).as_dict()
     if infostatus.running:
         return infostatus.model_dump(mode="json")
 
@@ -0,0 +1,76 @@
+"""
+Benchmark: EPG der Favoriten in einer Anfrage vs. parallel in Gruppen (epg_shard_size).
+
+Der simulierte DVBViewer-Server (httpx.MockTransport) bearbeitet die Kanäle
+einer Anfrage nacheinander: Antwortzeit = Grundlatenz + Kanäle * Zeit pro Kanal.
+
+    python -m scripts.bench_epg_shards --channels 40 --base 0.05 --per-channel 0.02
+"""
+from datetime import datetime, timedelta
+import asyncio
+import time
+
+import click
+import httpx
+
+from backend.app.services.ms_service import AsyncMediaServer
+
+
+def channel_xml(count: int) -> str:
+    channels = "".join(
+        f'<channel nr="{i}" name="Channel {i}" EPGID="epg{i}" flags="1" ID="{i}"/>' for i in range(count)
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?><channels><root><group>{channels}</group></root></channels>'
+
+
+def epg_xml(epgids: list[str], per_channel: int) -> str:
+    start = datetime(2025, 1, 1)
+    programmes = []
+    for epgid in epgids:
+        for i in range(per_channel):
+            begin = start + timedelta(minutes=30 * i)
+            programmes.append(
+                f'<programme start="{begin:%Y%m%d%H%M%S}" stop="{begin + timedelta(minutes=30):%Y%m%d%H%M%S}"'
+                f' channel="{epgid}"><eventid>{i}</eventid><charset>255</charset>'
+                f'<titles><title>Title {epgid} {i}</title></titles>'
+                f'<descriptions><description>{"x" * 200}</description></descriptions></programme>'
+            )
+    return f'<?xml version="1.0" encoding="utf-8"?><epg>{"".join(programmes)}</epg>'
+
+
+def mock_transport(channels: int, base: float, per_channel: float, programmes: int) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == AsyncMediaServer.CHANNEL_LST:
+            return httpx.Response(200, text=channel_xml(channels))
+        epgids = request.url.params.get("ch", "").split(",")
+        # der Server sucht die Kanäle nacheinander
+        await asyncio.sleep(base + per_channel * len(epgids))
+        return httpx.Response(200, text=epg_xml(epgids, programmes))
+
+    return httpx.MockTransport(handler)
+
+
+async def run(transport: httpx.MockTransport, shard_size: int, concurrency: int) -> tuple[float, int]:
+    async with httpx.AsyncClient(transport=transport) as http:
+        ms = AsyncMediaServer(http, "http://mock/", shard_size=shard_size, shard_concurrency=concurrency)
+        started = time.perf_counter()
+        count = len(await ms.epg_lst(favonly=True))
+        return time.perf_counter() - started, count
+
+
+@click.command()
+@click.option("--channels", default=40, help="Anzahl Favoriten-Kanäle")
+@click.option("--programmes", default=50, help="Sendungen je Kanal")
+@click.option("--base", default=0.05, help="Grundlatenz je Anfrage (s)")
+@click.option("--per-channel", default=0.02, help="Serverzeit je Kanal (s)")
+@click.option("--concurrency", default=4, help="max. gleichzeitige Anfragen")
+def main(channels: int, programmes: int, base: float, per_channel: float, concurrency: int):
+    transport = mock_transport(channels, base, per_channel, programmes)
+    print(f"{'shard_size':>10} {'seconds':>8} {'epgs':>6}")
+    for shard_size in [0, 1, 2, 5, 10, 20]:
+        seconds, count = asyncio.run(run(transport, shard_size, concurrency))
+        print(f"{shard_size or 'single':>10} {seconds:8.3f} {count:6}")
+
+
+if __name__ == "__main__":
+    main()
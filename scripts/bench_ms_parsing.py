@@ -0,0 +1,86 @@
+"""
+Benchmark: Timer- und Kanallisten des Media-Servers in Modelle umwandeln.
+
+Vergleicht je 1000 Einträge
+  - XML -> dicts (ms_transformers)
+  - einzeln model_validate (ohne Datums-/Zeit-Cache)
+  - einzeln model_validate (mit Cache)
+  - TypeAdapter(list[...]) in einem Aufruf (mit Cache, wie ms_service)
+
+    python -m scripts.bench_ms_parsing --count 5000
+"""
+from datetime import date, timedelta
+import time
+
+import click
+
+from backend.app.services import ms_types
+from backend.app.services.ms_transformers import xml_to_channellst, xml_to_timerlst
+from backend.app.services.ms_types import MS_Channel, MS_ChannelList, MS_Timer, MS_TimerList
+
+
+def timer_xml(count: int) -> str:
+    timers = []
+    for i in range(count):
+        day = date(2025, 7, 1) + timedelta(days=i % 14)
+        timers.append(
+            f'<Timer Type="1" ID="{{{i:08d}-0000-0000-0000-000000000000}}" Enabled="-1" Priority="50"'
+            f' Charset="255" Date="{day:%d.%m.%Y}" Start="{i % 24:02d}:{(i * 5) % 60:02d}:00"'
+            f' Dur="{90 + i % 60}" End="23:59:00" Action="0" PreEPG="5" PostEPG="5" EPGEventID="{i}">'
+            f'<Descr>Movie {i}</Descr><Options AdjustPAT="-1"/><Format>2</Format><Folder>Auto</Folder>'
+            f'<NameScheme>%event</NameScheme><Source>Mock</Source><Title>Movie {i}</Title>'
+            f'<Channel ID="{2359890668641593480 + i % 40}|Channel {i % 40}" EPGID="epg{i % 40}"/>'
+            f'<Executeable>0</Executeable><Recording>0</Recording><ID>{i}</ID><GUID>{i}</GUID>'
+            f'<IntID>{i}</IntID><Timeshift>0</Timeshift></Timer>'
+        )
+    return f'<?xml version="1.0" encoding="utf-8"?><Timers>{"".join(timers)}</Timers>'
+
+
+def channel_xml(count: int) -> str:
+    channels = "".join(
+        f'<channel nr="{i}" name="Channel {i}" EPGID="epg{i}" flags="1" ID="{i}"/>' for i in range(count)
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?><channels><root><group>{channels}</group></root></channels>'
+
+
+def clear_caches() -> None:
+    ms_types.str2date.cache_clear()
+    ms_types.str2time.cache_clear()
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@click.command()
+@click.option("--count", default=5000, help="Anzahl Timer/Kanäle")
+@click.option("--repeat", default=5, help="Wiederholungen (bester Wert zählt)")
+def main(count: int, repeat: int):
+    for name, xml, transform, model, adapter in [
+        ("timers", timer_xml(count), xml_to_timerlst, MS_Timer, MS_TimerList),
+        ("channels", channel_xml(count), xml_to_channellst, MS_Channel, MS_ChannelList),
+    ]:
+        dicts = transform(xml)
+        print(f"{name} ({count}), ms per 1000")
+
+        def single_uncached():
+            for d in dicts:
+                clear_caches()
+                model.model_validate(d)
+
+        results = {"xml -> dicts": measure(lambda: transform(xml), repeat)}
+        if model is MS_Timer:  # nur Timer haben Datums-/Zeitfelder
+            results["model_validate, no cache"] = measure(single_uncached, repeat)
+        results["model_validate, cached"] = measure(lambda: [model.model_validate(d) for d in dicts], repeat)
+        results["TypeAdapter, cached"] = measure(lambda: adapter.validate_python(dicts), repeat)
+        for label, seconds in results.items():
+            print(f"  {label:<26} {seconds * 1000 * 1000 / count:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: XML-Backends der Media-Server-Transformer (ElementTree vs. lxml).
+
+Ohne Optionen werden Fixtures erzeugt; aufgezeichnete Antworten des
+DVBViewer-Servers (epg.html, timerlist.html, getchannelsxml.html) können
+mit --epg/--timers/--channels übergeben werden.
+
+    python -m scripts.bench_xml_parser --epg data/epg.xml --timers data/timerlist.xml
+"""
+from pathlib import Path
+from typing import Callable, Optional
+import time
+
+import click
+
+from backend.app.services import ms_transformers as mt
+from scripts.bench_epg_shards import epg_xml
+from scripts.bench_ms_parsing import channel_xml, timer_xml
+
+
+def backends() -> list:
+    result: list = [mt.EtreeBackend()]
+    if mt.lxml_etree is not None:
+        result.append(mt.LxmlBackend())
+    return result
+
+
+def measure(func: Callable[[], int], repeat: int) -> tuple[float, int]:
+    best, count = float("inf"), 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = func()
+        best = min(best, time.perf_counter() - started)
+    return best, count
+
+
+def fixture(path: Optional[str], generate: Callable[[], str]) -> bytes:
+    return Path(path).read_bytes() if path else generate().encode("utf-8")
+
+
+@click.command()
+@click.option("--epg", "epg_path", default=None, help="aufgezeichnete epg.html-Antwort")
+@click.option("--timers", "timers_path", default=None, help="aufgezeichnete timerlist.html-Antwort")
+@click.option("--channels", "channels_path", default=None, help="aufgezeichnete getchannelsxml.html-Antwort")
+@click.option("--repeat", default=5, help="Wiederholungen (bester Wert zählt)")
+def main(epg_path: Optional[str], timers_path: Optional[str], channels_path: Optional[str], repeat: int):
+    epg = fixture(epg_path, lambda: epg_xml([f"epg{i}" for i in range(40)], 300))
+    timers = fixture(timers_path, lambda: timer_xml(2000))
+    channels = fixture(channels_path, lambda: channel_xml(2000))
+    chunks = [epg[i:i + 65536] for i in range(0, len(epg), 65536)]
+    if mt.lxml_etree is None:
+        print("lxml not installed, only ElementTree is measured")
+    print(f"{'backend':<8} {'case':<16} {'ms':>8} {'entries':>8}")
+    for backend in backends():
+        cases = {
+            "epg (tree)": lambda: len(mt.xml_to_epglst(epg, backend=backend)),
+            "epg (stream)": lambda: sum(1 for _ in mt.iter_epglst(chunks, backend=backend)),
+            "timers": lambda: len(mt.xml_to_timerlst(timers, backend=backend)),
+            "channels": lambda: len(mt.xml_to_channellst(channels, backend=backend)),
+        }
+        for case, func in cases.items():
+            seconds, count = measure(func, repeat)
+            print(f"{backend.name:<8} {case:<16} {seconds * 1000:8.1f} {count:8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app.my_types import EPG
+from backend.app.services.ms_types import MS_Timer
+
+
+def make_epg(eventid: int = 1, title: str = "Film", description: str = "Beschreibung",
+             start: datetime = datetime(2025, 7, 1, 20, 15), minutes: int = 90,
+             tv_channel: str = "1", **kwargs) -> EPG:
+    data = dict(title=title, event="", description=description, eventid=eventid, content=0, pdc=0,
+                charset=255, start=start, stop=start + timedelta(minutes=minutes), epgchannel="c",
+                contentinfo=[], tv_channel=tv_channel, tv_name="Sender")
+    data.update(kwargs)
+    return EPG.model_validate(data)
+
+
+def make_timer(timer_id: int, start: datetime, minutes: int, channel_id: str = "1") -> MS_Timer:
+    return MS_Timer.model_validate({
+        "Descr": f"Timer {timer_id}", "Options": {"AdjustPAT": "-1"}, "Format": "2", "Folder": "Auto",
+        "NameScheme": "%event", "Title": f"Timer {timer_id}", "Source": "Test",
+        "Channel": {"ID": f"{channel_id}|Sender", "EPGID": "epg"}, "Executeable": "0", "Recording": "0",
+        "ID": str(timer_id), "GUID": str(timer_id), "Type": "1", "Enabled": "-1", "Charset": "255",
+        "IntID": str(timer_id), "Priority": 50, "Action": "0", "Timeshift": "0",
+        "Date": f"{start:%d.%m.%Y}", "Start": f"{start:%H:%M:%S}", "End": "00:00:00", "Dur": str(minutes),
+    })
+
+
+@pytest.fixture
+def epg_factory():
+    return make_epg
+
+
+@pytest.fixture
+def timer_factory():
+    return make_timer
@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.batch_ctrl import BatchCategorizer
+from backend.app.services.chat_service import ChatRequestError
+
+
+def ok_line(custom_id: str, content: str) -> str:
+    return json.dumps({
+        "id": f"req_{custom_id}", "custom_id": custom_id, "error": None,
+        "response": {"status_code": 200, "request_id": "r", "body": {
+            "id": "c", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}]}},
+    })
+
+
+def failed_line(custom_id: str, status: int = 400) -> str:
+    return json.dumps({
+        "id": f"req_{custom_id}", "custom_id": custom_id, "error": None,
+        "response": {"status_code": status, "request_id": "r",
+                     "body": {"error": {"message": "Invalid request", "type": "invalid_request_error"}}},
+    })
+
+
+class StubBatchClient:
+    """Lokaler Ersatz der Batch-API: beantwortet die hochgeladenen Anfragen per `answer`"""
+
+    default_model = "stub"
+
+    def __init__(self, answer, status: str = "completed"):
+        self.answer = answer
+        self.status = status
+        self.files: dict[str, str] = {}
+        self.polls = 0
+
+    def batch_submit(self, filepath: Path, endpoint: str = "") -> SimpleNamespace:
+        output, errors = [], []
+        for request in map(json.loads, filepath.read_text().splitlines()):
+            line = self.answer(request["custom_id"])
+            (errors if '"error": {"code"' in line else output).append(line)
+        self.files = {"out": "\n".join(output), "err": "\n".join(errors)}
+        return SimpleNamespace(id="batch_1")
+
+    def batch_status(self, batch_id: str) -> SimpleNamespace:
+        self.polls += 1
+        status = "in_progress" if self.polls == 1 else self.status
+        return SimpleNamespace(id=batch_id, status=status, request_counts=None,
+                               output_file_id="out" if self.files["out"] else None,
+                               error_file_id="err" if self.files["err"] else None)
+
+    def batch_content(self, file_id: str) -> str:
+        return self.files[file_id]
+
+
+def test_parse_results_skips_invalid_lines():
+    failed: set[str] = set()
+    content = "\n".join([ok_line("a", '{"category": "Movie"}'), failed_line("b"), "{kaputt",
+                         ok_line("c", "keine JSON-Antwort"), ""])
+    assert BatchCategorizer.parse_results(content, failed) == {"a": "Movie"}
+    assert failed == {"b"}
+
+
+def test_parse_errors():
+    content = json.dumps({"id": "x", "custom_id": "d", "response": None,
+                          "error": {"code": "server_error", "message": "boom"}})
+    assert BatchCategorizer.parse_errors(content) == {"d"}
+
+
+def test_categorize_against_stub(tmp_path, epg_factory):
+    epgs = [epg_factory(eventid=i) for i in range(1, 6)]
+    ids = [epg.real_id for epg in epgs]
+
+    def answer(custom_id: str) -> str:
+        if custom_id == ids[0]:
+            return ok_line(custom_id, '<think>hmm</think>{"category": "Movie"}')
+        if custom_id == ids[1]:
+            return failed_line(custom_id)
+        if custom_id == ids[2]:
+            return json.dumps({"id": "x", "custom_id": custom_id, "response": None,
+                               "error": {"code": "server_error", "message": "boom"}})
+        if custom_id == ids[3]:
+            return ok_line(custom_id, "keine JSON-Antwort")
+        return ok_line(custom_id, '{"category": "Serie"}')
+
+    client = StubBatchClient(answer)
+    categorizer = BatchCategorizer(client=client, prompttxt="<EPGENTRY>")  # type: ignore[arg-type]
+    categorizer.categorize(epgs, filepath=tmp_path / "batch.jsonl", poll=0)
+
+    assert client.polls == 2
+    # fehlgeschlagene Anfragen bleiben ohne Kategorie, unbrauchbare Antworten werden "Other"
+    assert [epg.contentinfo for epg in epgs] == [["Movie"], [], [], ["Other"], ["Serie"]]
+
+
+def test_categorize_failed_batch_raises(tmp_path, epg_factory):
+    client = StubBatchClient(lambda custom_id: ok_line(custom_id, '{"category": "Movie"}'), status="failed")
+    categorizer = BatchCategorizer(client=client, prompttxt="<EPGENTRY>")  # type: ignore[arg-type]
+    with pytest.raises(ChatRequestError):
+        categorizer.categorize([epg_factory()], filepath=tmp_path / "batch.jsonl", poll=0)
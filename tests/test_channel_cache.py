@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.app.services import channel_cache
+from backend.app.services.channel_cache import ChannelCache
+from backend.app.services.ms_service import AsyncMediaServer, MediaServer
+from backend.app.services.resilience import CircuitBreaker
+
+TV = 1 << 61
+RADIO = 2 << 61
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(channel_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_hit_and_expiry(clock):
+    cache: ChannelCache[list[int]] = ChannelCache(ttl=10)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [len(loads)]
+
+    assert cache.fetch("fav", loader) == [1]
+    clock[0] += 9
+    assert cache.fetch("fav", loader) == [1]
+    clock[0] += 1
+    assert cache.fetch("fav", loader) == [2]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_invalidate_and_no_ttl(clock):
+    cache: ChannelCache[str] = ChannelCache(ttl=10)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.invalidate("a")
+    assert cache.get("a") is None and cache.get("b") == "2"
+    cache.invalidate()
+    assert cache.get("b") is None
+
+    uncached: ChannelCache[str] = ChannelCache(ttl=0)
+    uncached.put("a", "1")
+    assert uncached.get("a") is None
+
+
+def test_afetch_loads_once_for_concurrent_calls():
+    cache: ChannelCache[str] = ChannelCache(ttl=10)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return "kanäle"
+
+    async def main():
+        return await asyncio.gather(*(cache.afetch("fav", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["kanäle"] * 5
+    assert len(loads) == 1
+
+
+def channel_xml() -> str:
+    channels = [(1, "Das Erste", "e1", TV + 1), (2, "Radio Eins", "e2", RADIO + 2), (3, "Ohne EPG", "", TV + 3)]
+    entries = "".join(f'<channel nr="{nr}" name="{name}" EPGID="{epgid}" flags="1" ID="{channel_id}"/>'
+                      for nr, name, epgid, channel_id in channels)
+    return f'<?xml version="1.0" encoding="utf-8"?><channels><root><group>{entries}</group></root></channels>'
+
+
+def transport(requests: list[httpx.Request]) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, text=channel_xml())
+    return httpx.MockTransport(handler)
+
+
+def test_media_server_requests_one_list_per_favonly():
+    requests: list[httpx.Request] = []
+    media = MediaServer(httpx.Client(transport=transport(requests)), "http://cache-sync",
+                        breaker=CircuitBreaker())
+
+    assert [c.name for c in media.channel_lst()] == ["Das Erste", "Radio Eins", "Ohne EPG"]
+    assert [c.name for c in media.channel_lst(tvonly=True)] == ["Das Erste", "Ohne EPG"]
+    assert [c.name for c in media.channel_lst(tvonly=True, epgonly=True)] == ["Das Erste"]
+    assert len(requests) == 1
+    media.channel_lst(favonly=True)
+    assert len(requests) == 2 and requests[1].url.params["favonly"] == "1"
+
+    # Aufrufer bekommen Kopien, der Cache bleibt unverändert
+    media.channel_lst()[0].name = "geändert"
+    assert media.channel_lst()[0].name == "Das Erste"
+
+
+def test_async_media_server_caches_channels():
+    requests: list[httpx.Request] = []
+
+    async def main():
+        media = AsyncMediaServer(httpx.AsyncClient(transport=transport(requests)), "http://cache-async",
+                                 breaker=CircuitBreaker())
+        lists = await asyncio.gather(media.channel_lst(tvonly=True), media.channel_lst(epgonly=True))
+        return [[c.name for c in channels] for channels in lists]
+
+    assert asyncio.run(main()) == [["Das Erste", "Ohne EPG"], ["Das Erste", "Radio Eins"]]
+    assert len(requests) == 1
@@ -0,0 +1,39 @@
+import pytest
+
+from backend.app.chat_ctrl import group_epgs, parse_batch_answer
+
+
+def test_parse_batch_answer():
+    text = '```json\n[{"eventid": 1, "category": "Movie"}, {"eventid": "2"}, {"foo": 3}]\n```'
+    assert parse_batch_answer(text) == {1: "Movie", 2: "Other"}
+
+
+def test_parse_batch_answer_wrapped_list():
+    assert parse_batch_answer('{"result": [{"eventid": 7, "category": "Serie"}]}') == {7: "Serie"}
+
+
+@pytest.mark.parametrize("text", ['{"eventid": 1}', '"Movie"'])
+def test_parse_batch_answer_rejects_non_list(text):
+    with pytest.raises(ValueError):
+        parse_batch_answer(text)
+
+
+def test_group_epgs_by_title_and_description(epg_factory):
+    epgs = [
+        epg_factory(eventid=1, title="Das Boot", description="U-Boot im Zweiten Weltkrieg."),
+        epg_factory(eventid=2, title="Das  boot", description="U-Boot im Zweiten Weltkrieg!"),
+        epg_factory(eventid=3, title="Das Boot", description="Serie über die Besatzung eines U-Boots."),
+        epg_factory(eventid=4, title="Metropolis", description="U-Boot im Zweiten Weltkrieg."),
+    ]
+    groups = group_epgs(epgs)
+    assert [[epg.eventid for epg in group] for group in groups] == [[1, 2], [3], [4]]
+
+
+def test_group_epgs_empty_description_only_with_empty(epg_factory):
+    epgs = [
+        epg_factory(eventid=1, title="Rocky", description=""),
+        epg_factory(eventid=2, title="Rocky", description="Boxerdrama"),
+        epg_factory(eventid=3, title="Rocky", description=""),
+    ]
+    groups = group_epgs(epgs)
+    assert [[epg.eventid for epg in group] for group in groups] == [[1, 3], [2]]
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.services.chat_service import (ChatRequestError, FailoverChatClient, JsonScanner,
+                                               LatencyHistogram)
+
+
+def feed_all(chunks: list[str]) -> tuple[int, str | None]:
+    scanner = JsonScanner()
+    for idx, chunk in enumerate(chunks):
+        if (result := scanner.feed(chunk)) is not None:
+            return idx, result
+    return len(chunks), None
+
+
+def test_scanner_stops_at_first_complete_value():
+    chunks = ['Antwort: [{"eventid": 1, ', '"category": "Mo', 'vie"}]', ' und noch Text']
+    assert feed_all(chunks) == (2, '[{"eventid": 1, "category": "Movie"}]')
+
+
+def test_scanner_ignores_brackets_in_strings():
+    assert feed_all(['{"a": "]}\\"", ', '"b": [1, {"c": 2}]}'])[1] == '{"a": "]}\\"", "b": [1, {"c": 2}]}'
+
+
+def test_scanner_skips_think_block():
+    chunks = ['<thi', 'nk>vielleicht {"x": 1}', '</think>\n', '{"category": "Movie"}']
+    assert feed_all(chunks) == (3, '{"category": "Movie"}')
+
+
+def test_scanner_incomplete():
+    assert feed_all(['[{"eventid": 1}']) == (1, None)
+
+
+class FakeClient:
+    """Ersatz für AsyncChatClient: antwortet nach `delay` Sekunden oder wirft `error`"""
+
+    stream = False
+    _base_url = "http://llm"
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception | None = None):
+        self.provider = name
+        self.default_model = f"{name}-model"
+        self.delay = delay
+        self.error = error
+        self.latency = LatencyHistogram()
+        self.models: list[str | None] = []
+        self.cancelled = False
+
+    async def ask(self, messages, model=None):
+        self.models.append(model)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.provider
+
+
+def ask(*clients, **options):
+    failover = FailoverChatClient(clients=list(clients), **options)  # type: ignore[arg-type]
+    started = time.monotonic()
+    answer = asyncio.run(failover.ask([{"role": "user", "content": "x"}], model="wunsch"))
+    return answer, time.monotonic() - started
+
+
+def test_failover_on_error():
+    primary, secondary = FakeClient("a", error=ChatRequestError("down")), FakeClient("b")
+    assert ask(primary, secondary)[0] == "b"
+    assert primary.latency.errors == 1
+    # das angefragte Modell gilt nur für den primären Provider
+    assert (primary.models, secondary.models) == (["wunsch"], [None])
+
+
+def test_failover_on_timeout():
+    primary, secondary = FakeClient("a", delay=1.0), FakeClient("b")
+    answer, elapsed = ask(primary, secondary, timeout=0.05)
+    assert answer == "b" and elapsed < 0.5
+    assert primary.cancelled
+
+
+def test_no_hedge_before_delay():
+    primary, secondary = FakeClient("a", delay=0.01), FakeClient("b")
+    assert ask(primary, secondary, hedge_delay=0.5)[0] == "a"
+    assert secondary.models == []
+
+
+def test_hedge_faster_secondary_wins():
+    primary, secondary = FakeClient("a", delay=1.0), FakeClient("b", delay=0.01)
+    answer, elapsed = ask(primary, secondary, hedge_delay=0.05)
+    assert answer == "b" and elapsed < 0.5
+    assert primary.cancelled
+
+
+def test_hedge_primary_still_wins():
+    primary, secondary = FakeClient("a", delay=0.1), FakeClient("b", delay=1.0)
+    answer, elapsed = ask(primary, secondary, hedge_delay=0.02)
+    assert answer == "a" and elapsed < 0.5
+    assert secondary.models == [None] and secondary.cancelled
+
+
+def test_all_providers_failed():
+    with pytest.raises(ChatRequestError):
+        ask(FakeClient("a", error=ChatRequestError("x")), FakeClient("b", error=ChatRequestError("y")),
+            hedge_delay=0.01)
@@ -0,0 +1,42 @@
+import pytest
+
+from backend.app.epg_categorie import classify_text, preclassify
+
+
+@pytest.mark.parametrize("title, event, description, category", [
+    ("Der Pate", "Spielfilm", "", "Movie"),
+    ("Heat", "", "Thriller, USA 1995. Ein Meisterdieb ...", "Movie"),
+    ("Amélie", "", "Frankreich 2001, 122 Min. Eine junge Frau ...", "Movie"),
+    ("Notruf Hafenkante", "Krimiserie", "", "Serial"),
+    ("Die Rosenheim-Cops", "Folge 12", "", "Serial"),
+    ("Babylon Berlin", "", "(3/8) Gereon Rath ermittelt.", "Serial"),
+    ("Terra X", "Dokumentation", "", "Docu"),
+    ("Tagesschau", "", "", "News"),
+    ("Sportschau", "Bundesliga am Samstag", "", "Sport"),
+])
+def test_rules(title, event, description, category):
+    assert classify_text(title, event, description) == category
+
+
+@pytest.mark.parametrize("title, event, description", [
+    ("Das Boot", "", "Drei U-Boot-Fahrer ..."),  # kein eindeutiger Hinweis
+    ("Tatort", "Fernsehfilm", "Folge 1234 der Reihe"),  # Movie und Serial
+    ("Filmriss", "", ""),  # Wortteil, kein Hinweis
+])
+def test_rules_undecided(title, event, description):
+    assert classify_text(title, event, description) is None
+
+
+def test_description_only_first_300_chars():
+    assert classify_text("X", "", "a" * 300 + " Spielfilm") is None
+
+
+def test_preclassify(epg_factory):
+    epgs = [epg_factory(eventid=1, title="Tagesschau", description=""),
+            epg_factory(eventid=2, title="Das Boot", description="Drei U-Boot-Fahrer"),
+            epg_factory(eventid=3, title="Tagesthemen", description="", contentinfo=["Other"])]
+
+    remaining = preclassify(epgs)
+
+    assert [epg.eventid for epg in remaining] == [2, 3]
+    assert [epg.contentinfo for epg in epgs] == [["News"], [], ["Other"]]
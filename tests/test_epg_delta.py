@@ -0,0 +1,41 @@
+from backend.app.epg_delta import EpgSnapshot
+
+
+def test_snapshot_reuses_unchanged_categories(tmp_path, epg_factory):
+    filepath = tmp_path / "snapshot.json"
+    snapshot = EpgSnapshot(filepath)
+    epgs = [epg_factory(eventid=1, title="A"), epg_factory(eventid=2, title="B"),
+            epg_factory(eventid=3, title="C")]
+    snapshot.apply(epgs)
+    epgs[0].contentinfo.append("Movie")
+    epgs[1].contentinfo.append("Other")
+    epgs[2].contentinfo.append("Serie")
+    snapshot.save(epgs)
+
+    snapshot = EpgSnapshot(filepath)
+    epgs = [epg_factory(eventid=1, title="A"), epg_factory(eventid=2, title="B"),
+            epg_factory(eventid=3, title="C geändert"), epg_factory(eventid=4, title="D")]
+    snapshot.apply(epgs)
+
+    # "Other" wird nicht gespeichert, geänderte und neue EPGs bleiben leer
+    assert [epg.contentinfo for epg in epgs] == [["Movie"], [], [], []]
+
+
+def test_snapshot_drops_missing_epgs(tmp_path, epg_factory):
+    filepath = tmp_path / "snapshot.json"
+    snapshot = EpgSnapshot(filepath)
+    epgs = [epg_factory(eventid=1), epg_factory(eventid=2)]
+    snapshot.apply(epgs)
+    snapshot.save(epgs)
+
+    snapshot = EpgSnapshot(filepath)
+    epgs = [epg_factory(eventid=2)]
+    snapshot.apply(epgs)
+    snapshot.save(epgs)
+    assert list(EpgSnapshot(filepath).entries) == [epgs[0].real_id]
+
+
+def test_unreadable_snapshot_means_full_run(tmp_path):
+    filepath = tmp_path / "snapshot.json"
+    filepath.write_text("{kaputt")
+    assert EpgSnapshot(filepath).entries == {}
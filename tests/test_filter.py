@@ -0,0 +1,38 @@
+from backend.app.filter import PrefixTrie, TitleBlacklstFilter
+
+
+def test_prefix_trie():
+    trie = PrefixTrie(["Tatort ", "Sturm der"])
+    assert trie.match("Tatort (1234)")
+    assert trie.match("Sturm der Liebe")
+    assert not trie.match("Tatorte")
+    assert not PrefixTrie().match("Tatort")
+    assert PrefixTrie([""]).match("alles")
+
+
+def test_default_prefixes_not_shared():
+    trie = PrefixTrie()
+    trie.add("Tatort")
+    assert not PrefixTrie().match("Tatort")
+
+
+def make_filter(tmp_path, lines: list[str], normalize: bool) -> TitleBlacklstFilter:
+    filepath = tmp_path / "blacklist.txt"
+    filepath.write_text("\n".join(lines), encoding="utf-8")
+    return TitleBlacklstFilter({"path": str(filepath), "normalize": normalize})
+
+
+def test_blacklist_exact_and_prefix(tmp_path, epg_factory):
+    blacklist = make_filter(tmp_path, ["# Kommentar", "Das Boot", "Tatort *"], normalize=False)
+    assert not blacklist(epg_factory(title="Das Boot"))
+    assert blacklist(epg_factory(title="das boot"))
+    assert not blacklist(epg_factory(title="Tatort Münster"))
+    assert blacklist(epg_factory(title="Tatorte"))
+
+
+def test_blacklist_normalized_prefix_keeps_space(tmp_path, epg_factory):
+    blacklist = make_filter(tmp_path, ["Das Boot", "Tatort *", "Küstenwache*"], normalize=True)
+    assert not blacklist(epg_factory(title=" das BOOT "))
+    assert not blacklist(epg_factory(title="TATORT Münster"))
+    assert blacklist(epg_factory(title="Tatorte"))
+    assert not blacklist(epg_factory(title="Kuestenwache Spezial"))
@@ -0,0 +1,117 @@
+from backend.app.filter_engine import FilterEngine, FilterOrder, run_filters
+from backend.app.my_types import EPG, EPGFilter
+
+
+class CountingFilter(EPGFilter):
+    """Lehnt EPGs mit den angegebenen Event-IDs ab und zählt die Aufrufe"""
+
+    def __init__(self, reject: set[int]):
+        self.reject = reject
+        self.calls = 0
+
+    def __call__(self, epg: EPG) -> bool:
+        self.calls += 1
+        return epg.eventid not in self.reject
+
+    def __str__(self):
+        return f"{type(self).__name__}({sorted(self.reject)})"
+
+
+class FirstFilter(CountingFilter):
+    pass
+
+
+class SecondFilter(CountingFilter):
+    pass
+
+
+def test_short_circuit_counts(epg_factory):
+    epgs = [epg_factory(eventid=i) for i in range(1, 6)]
+    first, second = FirstFilter({1, 2}), SecondFilter({1, 3})
+    engine = FilterEngine([first, second])
+
+    survivors, rejections = engine.run(epgs)
+
+    assert [epg.eventid for epg in survivors] == [4, 5]
+    # EPG 1 wird schon vom ersten Filter abgelehnt, der zweite sieht es nicht
+    assert first.calls == 5 and second.calls == 3
+    stats = {s["filter"]: (s["evaluated"], s["rejected"]) for s in engine.stats_lst()}
+    assert stats == {str(first): (5, 2), str(second): (3, 1)}
+    assert [(r.real_id, r.filter) for r in rejections] == [
+        (epgs[0].real_id, str(first)), (epgs[1].real_id, str(first)), (epgs[2].real_id, str(second))]
+
+
+def test_run_returns_only_new_rejections(epg_factory):
+    engine = FilterEngine([FirstFilter({1})])
+    _, rejections = engine.run([epg_factory(eventid=1)])
+    _, rejections = engine.run([epg_factory(eventid=1), epg_factory(eventid=2)])
+    assert len(rejections) == 1
+    assert len(engine.rejections) == 2
+
+
+def test_order_by_cost_and_override(tmp_path):
+    order = FilterOrder(tmp_path / "stats.json")
+    order.entries = {
+        "FirstFilter": {"evaluated": 100, "seconds": 1.0, "sampled": 10, "sample_rejected": 1},
+        "SecondFilter": {"evaluated": 100, "seconds": 1.0, "sampled": 10, "sample_rejected": 5},
+    }
+    first, second = FirstFilter(set()), SecondFilter(set())
+    assert order.order([first, second]) == [second, first]
+
+    order.override = ["FirstFilter"]
+    assert order.order([first, second]) == [first, second]
+
+
+def test_sample_counts_rejections_independent_of_position(epg_factory):
+    epgs = [epg_factory(eventid=i) for i in range(1, 11)]
+    first, second = FirstFilter({1, 2, 3, 4}), SecondFilter({1, 2, 3, 5})
+    engine = FilterEngine([first, second], sample=2)
+
+    survivors, rejections = engine.run(epgs)
+
+    # gleiches Ergebnis wie ohne Stichprobe
+    assert [epg.eventid for epg in survivors] == [6, 7, 8, 9, 10]
+    assert [r.filter for r in rejections] == [str(first)] * 4 + [str(second)]
+    # Stichprobe: EPGs 1, 3, 5, 7, 9 laufen durch beide Filter
+    stats = {s.key: s for s in engine.stats}
+    assert (stats["FirstFilter"].sampled, stats["FirstFilter"].sample_rejected) == (5, 2)
+    assert (stats["SecondFilter"].sampled, stats["SecondFilter"].sample_rejected) == (5, 3)
+    assert (stats["SecondFilter"].evaluated, stats["SecondFilter"].rejected) == (8, 1)
+
+
+def test_rear_filter_moves_forward(tmp_path, epg_factory):
+    filepath = tmp_path / "stats.json"
+    epgs = [epg_factory(eventid=i) for i in range(1, 101)]
+    # hinten in der Kette lehnt SecondFilter nie selbst ab, alle Treffer hat FirstFilter schon
+    order = FilterOrder(filepath, override=["FirstFilter"])
+    run_filters(epgs, [FirstFilter(set(range(1, 41))), SecondFilter(set(range(1, 31)))], "Test", [], order=order)
+
+    order = FilterOrder(filepath)
+    assert order.cost("SecondFilter") < float("inf")
+    assert order.entries["SecondFilter"]["rejected"] == 0
+
+
+def test_record_decays_previous_runs(tmp_path, epg_factory):
+    filepath = tmp_path / "stats.json"
+    order = FilterOrder(filepath)
+    order.entries = {"FirstFilter": {"evaluated": 100, "rejected": 40, "seconds": 1.0,
+                                     "sampled": 10, "sample_rejected": 4}}
+    engine = FilterEngine([FirstFilter(set())], sample=1)
+    engine.run([epg_factory(eventid=i) for i in range(1, 11)])
+    order.record(engine)
+
+    entry = FilterOrder(filepath).entries["FirstFilter"]
+    assert entry["evaluated"] == 60 and entry["rejected"] == 20
+    assert entry["sampled"] == 15 and entry["sample_rejected"] == 2
+
+
+def test_run_filters_records_stats(tmp_path, epg_factory):
+    filepath = tmp_path / "stats.json"
+    rejections = []
+    epgs = run_filters([epg_factory(eventid=i) for i in range(1, 4)], [FirstFilter({2})], "Test",
+                       rejections, order=FilterOrder(filepath))
+
+    assert [epg.eventid for epg in epgs] == [1, 3]
+    assert len(rejections) == 1
+    entry = FilterOrder(filepath).entries["FirstFilter"]
+    assert (entry["evaluated"], entry["rejected"]) == (3, 1)
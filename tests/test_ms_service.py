@@ -0,0 +1,27 @@
+from backend.app.mediasrv_ctrl import MS_ControllerBase
+from backend.app.services.ms_service import select_channels
+from backend.app.services.ms_types import MS_Channel
+
+TV = (1 << 61) | 4711
+RADIO = (2 << 61) | 4712
+
+
+def channel(channel_id: int, epgid: str = "epg") -> MS_Channel:
+    return MS_Channel.model_validate({"nr": "1", "name": "Sender", "EPGID": epgid, "flags": 0,
+                                      "ID": str(channel_id)})
+
+
+def test_is_tv_matches_controller():
+    for channel_id in (TV, RADIO, 4711, (5 << 61) | 1):
+        assert channel(channel_id).is_tv == MS_ControllerBase.is_tv_channel(channel_id)
+    assert channel(TV).is_tv and not channel(RADIO).is_tv
+    assert MS_ControllerBase.parse_channel_id(RADIO)["tv_radio_result"] == "Radio"
+
+
+def test_select_channels_returns_copies():
+    channels = [channel(TV), channel(RADIO), channel(TV + 1, epgid="")]
+    selected = select_channels(channels, tvonly=True, epgonly=True)
+    assert [c.channel_id for c in selected] == [str(TV)]
+    selected[0].name = "geändert"
+    assert channels[0].name == "Sender"
+    assert len(select_channels(channels)) == 3
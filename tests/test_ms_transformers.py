@@ -0,0 +1,57 @@
+import httpx
+import pytest
+
+from backend.app.services.ms_service import MediaServer
+from backend.app.services.ms_transformers import EpgStreamParser, LxmlBackend, xml_to_epglst
+from backend.app.services.resilience import CircuitBreaker
+
+PROGRAMME = ('<programme start="2025010{i}100000 +0100" stop="2025010{i}120000 +0100" channel="c1">'
+             '<eventid>{i}</eventid><titles><title>Mörder {i}</title></titles>'
+             '<descriptions><description>Straße, Größe, Café</description></descriptions></programme>')
+
+
+def epg_xml(count: int = 3, declaration: str = '') -> str:
+    return declaration + '<epg>' + ''.join(PROGRAMME.format(i=i) for i in range(1, count + 1)) + '</epg>'
+
+
+def parse(data: bytes, size: int, encoding: str | None = None, backend=None) -> list[dict]:
+    parser = EpgStreamParser(backend, encoding=encoding)
+    result = []
+    for pos in range(0, len(data), size):
+        result.extend(parser.feed(data[pos:pos + size]))
+    result.extend(parser.close())
+    return result
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 4096])
+def test_utf8_chunks_split_inside_characters(size):
+    data = epg_xml().encode("utf-8")
+    expected = xml_to_epglst(epg_xml())
+    assert parse(data, size) == expected
+    assert parse(data, size, encoding="utf-8") == expected
+    assert expected[0]["titles"] == {"title": "Mörder 1"}
+
+
+@pytest.mark.parametrize("declaration", ['', '<?xml version="1.0" encoding="iso-8859-1"?>'])
+def test_charset_from_header(declaration):
+    data = epg_xml(declaration=declaration).encode("latin-1")
+    result = parse(data, 5, encoding="iso-8859-1")
+    assert [d["titles"]["title"] for d in result] == ["Mörder 1", "Mörder 2", "Mörder 3"]
+    assert result[0]["descriptions"]["description"] == "Straße, Größe, Café"
+
+
+def test_charset_with_lxml():
+    pytest.importorskip("lxml")
+    data = epg_xml().encode("latin-1")
+    result = parse(data, 3, encoding="iso-8859-1", backend=LxmlBackend())
+    assert [d["titles"]["title"] for d in result] == ["Mörder 1", "Mörder 2", "Mörder 3"]
+
+
+def test_media_server_uses_response_charset():
+    body = epg_xml(count=2).encode("latin-1")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/xml; charset=iso-8859-1"}, content=body)
+
+    media = MediaServer(httpx.Client(transport=httpx.MockTransport(handler)), "http://ms", breaker=CircuitBreaker())
+    assert [d["titles"]["title"] for d in media._epg_stream({})] == ["Mörder 1", "Mörder 2"]
@@ -0,0 +1,45 @@
+import pytest
+
+from backend.app.services import rate_limiter
+from backend.app.services.rate_limiter import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_reserves_and_refills(clock):
+    bucket = TokenBucket(60)  # 1 Token/s
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0)
+    clock[0] += 2
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock[0] += 100
+    assert bucket.reserve(1) == 0.0
+    assert bucket.tokens == pytest.approx(59.0)  # nie über die Kapazität
+
+
+def test_bucket_scale_slows_refill(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    assert bucket.reserve(1, scale=0.5) == pytest.approx(2.0)
+
+
+def test_bucket_caps_large_reservations(clock):
+    bucket = TokenBucket(10)
+    bucket.reserve(10)
+    assert bucket.reserve(1000) == pytest.approx(60.0)
+
+
+def test_throttle_and_recover(clock):
+    limiter = RateLimiter(rpm=60)
+    limiter.throttle(5)
+    limiter.throttle(5)
+    assert limiter.scale == pytest.approx(0.25)
+    assert limiter.paused_until == pytest.approx(105.0)
+    for _ in range(100):
+        limiter.success()
+    assert limiter.scale == 1.0
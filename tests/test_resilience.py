@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from backend.app.services import resilience
+from backend.app.services.ms_service import MediaServer
+from backend.app.services.resilience import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before()
+        breaker.failure(OSError("down"))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.failure(OSError("down"))
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    assert breaker.rejected == 1
+
+
+def test_success_resets_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.failure(OSError("down"))
+    breaker.success()
+    breaker.failure(OSError("down"))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def _open(breaker: CircuitBreaker, clock) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.failure(OSError("down"))
+    clock[0] += breaker.reset_timeout
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    _open(breaker, clock)
+
+    assert breaker.before() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.probing
+    with pytest.raises(CircuitOpenError):
+        breaker.before()  # nur eine Probe gleichzeitig
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before() is False
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    _open(breaker, clock)
+
+    breaker.before()
+    breaker.failure(OSError("still down"))
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    clock[0] += 30
+    assert breaker.before() is True
+
+
+def test_guard_releases_probe_without_verdict(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    _open(breaker, clock)
+
+    with pytest.raises(KeyError):
+        with breaker.guard("http://ms/api"):
+            raise KeyError("kein Ergebnis")
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.probing
+    with breaker.guard("http://ms/api"):
+        breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_media_server_timeouts():
+    media = MediaServer(httpx.Client(), "http://ms", timeouts={"epg": 60}, connect_timeout=3)
+    timeout = media._timeout(MediaServer.EPG_LST)
+    assert (timeout.connect, timeout.read) == (3, 60)
+    timeout = media._timeout(MediaServer.VERSION)
+    assert (timeout.connect, timeout.read) == (3, 10)
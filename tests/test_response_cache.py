@@ -0,0 +1,96 @@
+import httpx
+import pytest
+
+from backend.app.services.ms_service import MediaServer
+from backend.app.services.response_cache import ResponseCache, response_cache
+from backend.app.services.resilience import CircuitBreaker
+
+KEY = ResponseCache.key("/api/timerlist.html", {"utf8": 2})
+
+
+def response(status: int = 200, text: str = "", **headers: str) -> httpx.Response:
+    return httpx.Response(status, text=text, headers=headers,
+                          request=httpx.Request("GET", "http://ms/api/timerlist.html"))
+
+
+def counting_parser():
+    calls = []
+
+    def parse(text: str) -> list[str]:
+        calls.append(text)
+        return text.split(",")
+    return parse, calls
+
+
+def test_key_ignores_param_order():
+    assert ResponseCache.key("/x", {"a": 1, "b": "2"}) == ResponseCache.key("/x", {"b": 2, "a": "1"})
+
+
+def test_conditional_request_and_not_modified():
+    cache = ResponseCache()
+    parse, calls = counting_parser()
+    assert cache.headers(KEY) == {}
+    first = cache.resolve(KEY, response(text="a,b", etag='"v1"', **{"last-modified": "Mon"}), parse)
+    assert cache.headers(KEY) == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon"}
+
+    assert cache.resolve(KEY, response(304), parse) is first
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["requests"], stats["not_modified"], stats["bytes_saved"]) == (2, 1, 3)
+
+
+def test_same_body_is_not_parsed_again():
+    cache = ResponseCache()
+    parse, calls = counting_parser()
+    first = cache.resolve(KEY, response(text="a,b"), parse)
+    assert cache.resolve(KEY, response(text="a,b"), parse) is first
+    assert cache.resolve(KEY, response(text="a,c"), parse) == ["a", "c"]
+    assert calls == ["a,b", "a,c"] and cache.stats()["unchanged"] == 1
+
+
+def test_errors_are_not_cached():
+    cache = ResponseCache()
+    parse, _ = counting_parser()
+    with pytest.raises(httpx.HTTPStatusError):
+        cache.resolve(KEY, response(404), parse)
+    # 304 ohne Eintrag ist kein Treffer
+    with pytest.raises(httpx.HTTPStatusError):
+        cache.resolve(KEY, response(304), parse)
+    cache.resolve(KEY, response(text="a"), parse)
+    cache.invalidate()
+    assert cache.headers(KEY) == {}
+
+
+def test_shared_per_server():
+    assert response_cache("http://rc-1") is response_cache("http://rc-1")
+    assert response_cache("http://rc-1") is not response_cache("http://rc-2")
+
+
+
+
+TIMER_XML = ('<?xml version="1.0" encoding="utf-8"?><Timers>'
+             '<Timer Type="1" ID="{1}" Enabled="-1" Priority="50" Charset="255" Date="01.07.2025"'
+             ' Start="20:15:00" Dur="90" End="21:45:00" Action="0" PreEPG="5" PostEPG="5" EPGEventID="1">'
+             '<Descr>Film</Descr><Options AdjustPAT="-1"/><Format>2</Format><Folder>Auto</Folder>'
+             '<NameScheme>%event</NameScheme><Source>Mock</Source><Title>Film</Title>'
+             '<Channel ID="1|Sender" EPGID="epg1"/><Executeable>0</Executeable><Recording>0</Recording>'
+             '<ID>1</ID><GUID>1</GUID><IntID>1</IntID><Timeshift>0</Timeshift></Timer></Timers>')
+
+
+def test_media_server_uses_conditional_requests():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"t1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=TIMER_XML, headers={"etag": '"t1"'})
+
+    media = MediaServer(httpx.Client(transport=httpx.MockTransport(handler)), "http://rc-timers",
+                        breaker=CircuitBreaker())
+    first = media.timer_lst()
+    second = media.timer_lst()
+
+    assert [t.title for t in second] == ["Film"] and second == first
+    assert [r.headers.get("if-none-match") for r in requests] == [None, '"t1"']
+    assert media.responses.stats()["not_modified"] == 1
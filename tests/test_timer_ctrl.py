@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+from backend.app import timer_ctrl
+from backend.app.timer_ctrl import BulkTimerCreator
+
+
+class FakeController:
+    """Liefert je Titel vorgegebene Antworten bzw. Fehler der Reihe nach"""
+
+    def __init__(self, answers: dict[str, list]):
+        self.answers = answers
+        self.calls: list[str] = []
+
+    async def timer_add(self, epg, title, pre, post):
+        self.calls.append(epg.title)
+        answer = self.answers[epg.title].pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(timer_ctrl, "RETRY_BASE_DELAY", 0)
+
+
+def test_connect_errors_are_retried(epg_factory):
+    ctrl = FakeController({"Film": [httpx.ConnectError("refused"), httpx.ConnectTimeout("slow"), {}]})
+    [result] = asyncio.run(BulkTimerCreator(ctrl, max_retries=2).create([epg_factory()], []))
+    assert (result.status, result.attempts, result.error) == ("created", 3, None)
+
+
+def test_retries_are_limited(epg_factory):
+    ctrl = FakeController({"Film": [httpx.ConnectError("refused")] * 3})
+    [result] = asyncio.run(BulkTimerCreator(ctrl, max_retries=1).create([epg_factory()], []))
+    assert (result.status, result.attempts, result.error) == ("failed", 2, "refused")
+    assert len(ctrl.calls) == 2
+
+
+def test_read_timeout_is_not_retried(epg_factory):
+    # die Anfrage kann den Server erreicht haben: timeradd ist nicht idempotent
+    ctrl = FakeController({"Film": [httpx.ReadTimeout(""), {}]})
+    [result] = asyncio.run(BulkTimerCreator(ctrl).create([epg_factory()], []))
+    assert (result.status, result.attempts, result.error) == ("failed", 1, "ReadTimeout")
+
+
+def test_report_per_epg_in_order(epg_factory, timer_factory):
+    start = datetime(2025, 7, 1, 20, 15)
+    epgs = [
+        epg_factory(eventid=1, title="Neu", start=start),
+        epg_factory(eventid=1, title="Neu", start=start),
+        epg_factory(eventid=2, title="Vorhanden", start=start.replace(hour=22)),
+        epg_factory(eventid=3, title="Abgedeckt", start=start.replace(hour=18)),
+        epg_factory(eventid=4, title="Defekt", start=start.replace(hour=12)),
+    ]
+    timers = [timer_factory(1, start.replace(hour=21, minute=55), 120)]
+    ctrl = FakeController({"Neu": [{}], "Abgedeckt": [{"duperror": "1"}], "Defekt": [httpx.ReadError("reset")]})
+    results = asyncio.run(BulkTimerCreator(ctrl, concurrency=2).create(epgs, timers))
+    assert [(r.title, r.status) for r in results] == [
+        ("Neu", "created"), ("Neu", "duplicate"), ("Vorhanden", "exists"),
+        ("Abgedeckt", "covered"), ("Defekt", "failed")]
+    assert sorted(ctrl.calls) == ["Abgedeckt", "Defekt", "Neu"]
@@ -0,0 +1,36 @@
+import random
+from datetime import datetime, timedelta
+
+from backend.app.mediasrv_ctrl import MS_ControllerBase
+from backend.app.timer_index import TimerIndex
+
+
+def test_index_matches_linear_find_timer(epg_factory, timer_factory):
+    rng = random.Random(1)
+    base = datetime(2025, 7, 1)
+    timers = [timer_factory(i, base + timedelta(minutes=rng.randrange(0, 3 * 24 * 60, 5)),
+                            rng.randint(30, 240), channel_id=str(rng.randint(1, 5)))
+              for i in range(300)]
+    epgs = []
+    for i in range(1000):
+        timer = rng.choice(timers)
+        start = timer.start_datetime + timedelta(minutes=rng.randint(-60, 120))
+        epgs.append(epg_factory(eventid=i, start=start, minutes=rng.randint(10, 120),
+                                tv_channel=rng.choice([timer.channel_id, "9"])))
+
+    index = TimerIndex(timers)
+    found = 0
+    for epg in epgs:
+        linear = MS_ControllerBase.find_timer(epg, timers)
+        assert MS_ControllerBase.find_timer(epg, index) == linear
+        found += bool(linear)
+    assert found  # die Stichprobe enthält auch aufgenommene EPGs
+
+
+def test_timer_must_cover_whole_epg(epg_factory, timer_factory):
+    start = datetime(2025, 7, 1, 20)
+    index = TimerIndex([timer_factory(1, start, 60)])
+    assert index.find(epg_factory(start=start, minutes=60))
+    assert not index.find(epg_factory(start=start, minutes=61))
+    assert not index.find(epg_factory(start=start, minutes=60, tv_channel="2"))
+    assert index.running(epg_factory(start=start + timedelta(minutes=30), minutes=60))
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app import token_budget
+from backend.app.token_budget import BudgetExceededError, TokenBudget
+
+
+@pytest.fixture(autouse=True)
+def tokens(monkeypatch):
+    # 1 Token je Zeichen, ohne tiktoken
+    monkeypatch.setattr(token_budget, "count_message_tokens",
+                        lambda messages, model_name: sum(len(m.get("content", "")) for m in messages))
+
+
+def msg(n: int) -> list[dict[str, str]]:
+    return [{"role": "user", "content": "x" * n}]
+
+
+def test_reserves_and_rejects_when_exhausted():
+    budget = TokenBudget("m", max_tokens=100)
+    first = budget.check(msg(40))
+    second = budget.check(msg(40))
+    # laufende Anfragen zählen mit: 40 + 40 + 40 > 100
+    with pytest.raises(BudgetExceededError):
+        budget.check(msg(40))
+    assert budget.rejected == 1 and budget.reserved == first + second
+
+    budget.release(second)
+    assert budget.check(msg(40)) == 40
+
+
+def test_usage_replaces_estimate():
+    budget = TokenBudget("m", max_tokens=100, prompt_price=1.0, completion_price=2.0)
+    estimate = budget.check(msg(40))
+    budget.add(SimpleNamespace(prompt_tokens=30, completion_tokens=10), estimate)
+    assert (budget.reserved, budget.total_tokens, budget.requests) == (0, 40, 1)
+    assert budget.cost == pytest.approx(50 / 1_000_000)
+    # 40 verbraucht + 70 geschätzt > 100
+    with pytest.raises(BudgetExceededError):
+        budget.check(msg(70))
+    assert budget.check(msg(60)) == 60
+
+
+def test_without_usage_counts_estimate_and_answer():
+    budget = TokenBudget("m")
+    estimate = budget.check(msg(40))
+    budget.add(None, estimate, answer="y" * 25)
+    assert (budget.prompt_tokens, budget.completion_tokens) == (40, 25)
+
+
+def test_unlimited_budget():
+    budget = TokenBudget("m")
+    for _ in range(10):
+        budget.check(msg(1000))
+    assert budget.rejected == 0 and budget.as_dict()["budget"] is None
+
+
+def test_tokenizer_fallback(monkeypatch):
+    def offline(messages, model_name):
+        raise OSError("no network")
+
+    monkeypatch.setattr(token_budget, "count_message_tokens", offline)
+    budget = TokenBudget("m")
+    # 4 Zeichen je Token plus Overhead je Nachricht
+    assert budget.check(msg(400)) == 100 + 4 + 2